@@ -1,40 +1,213 @@
 import os
+import re
+import time
+import random
+import asyncio
 import logging
 import json
+import threading
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional
 
 # Conditional imports based on provider
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
 
 try:
     import openai
 except ImportError:
     openai = None
 
+try:
+    import h2  # noqa: F401  enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 from app.core.config import (
-    GEMINI_API_KEY, GEMINI_MODEL_ID,
+    GEMINI_API_KEY, GEMINI_MODEL_ID, GEMINI_API_BASE,
     OPENAI_API_KEY, OPENAI_API_BASE, OPENAI_MODEL_ID,
-    AI_PROVIDER
+    AI_PROVIDER, AI_HTTP_POOL_SIZE, AI_FAILOVER_PROVIDER,
+    AI_MAX_RETRIES, AI_BACKOFF_BASE, AI_BACKOFF_MAX,
+    AI_CONCURRENCY, AI_MAX_CONCURRENCY, validate_config
 )
+from app.core.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+
+@dataclass
+class RateLimitInfo:
+    """Rate-limit state reported by a provider in its response headers."""
+    remaining_requests: Optional[int] = None
+    # Seconds until the request quota resets
+    reset_requests: Optional[float] = None
+    # Seconds the provider asks us to wait before retrying
+    retry_after: Optional[float] = None
+
+_DURATION_PART_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parses durations such as '20ms', '1.5s' or '6m0s' into seconds."""
+    parts = _DURATION_PART_RE.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """Retry-After is either a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def parse_rate_limit_headers(headers) -> RateLimitInfo:
+    """Reads Retry-After and the x-ratelimit-* headers (OpenAI style) from a response."""
+    info = RateLimitInfo()
+    if headers is None:
+        return info
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            info.retry_after = float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    if info.retry_after is None:
+        info.retry_after = _parse_retry_after(headers.get("retry-after"))
+    remaining = headers.get("x-ratelimit-remaining-requests")
+    if remaining and remaining.isdigit():
+        info.remaining_requests = int(remaining)
+    info.reset_requests = _parse_duration(headers.get("x-ratelimit-reset-requests"))
+    return info
+
+class AIProviderError(Exception):
+    """
+    A failed provider call. `retryable` errors (rate limits, timeouts, 5xx
+    responses, malformed output) may succeed when the request is repeated.
+    """
+    def __init__(self, message: str, retryable: bool = False, rate_limit: RateLimitInfo = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.rate_limit = rate_limit or RateLimitInfo()
+
+class RateLimitError(AIProviderError):
+    """The provider answered 429; `rate_limit.retry_after` says how long to back off, if known."""
+    def __init__(self, message: str, rate_limit: RateLimitInfo = None):
+        super().__init__(message, retryable=True, rate_limit=rate_limit)
+
+def _record_token_usage(provider_name: str, prompt_tokens, completion_tokens):
+    if prompt_tokens:
+        LLM_TOKENS.inc(prompt_tokens, provider=provider_name, kind="prompt")
+    if completion_tokens:
+        LLM_TOKENS.inc(completion_tokens, provider=provider_name, kind="completion")
+
+def _raise_for_status(status_code: int, body: str, rate_limit: RateLimitInfo):
+    if status_code < 400:
+        return
+    message = f"HTTP {status_code}: {body[:500]}"
+    if status_code == 429:
+        raise RateLimitError(message, rate_limit)
+    raise AIProviderError(message, retryable=status_code in (408, 409) or status_code >= 500, rate_limit=rate_limit)
 
 class AIProvider(ABC):
     """Abstract Base Class for AI providers."""
+    # Short provider identifier, e.g. used as part of the summary cache key
+    provider_name = "unknown"
+    model_id = "unknown"
+
     @abstractmethod
+    def request_structured_output(self, prompt: str):
+        """
+        Generates structured JSON output from a prompt.
+        Returns (result, RateLimitInfo) and raises AIProviderError on failure.
+        """
+        pass
+
+    async def arequest_structured_output(self, prompt: str):
+        """
+        Async variant of request_structured_output, so many requests can be in
+        flight on one event loop. Providers with a native async client override
+        this; the default runs the blocking call in a worker thread.
+        """
+        return await asyncio.to_thread(self.request_structured_output, prompt)
+
     def generate_structured_output(self, prompt: str):
-        """Generates structured JSON output from a prompt."""
+        """Generates structured JSON output from a prompt; returns None on failure."""
+        try:
+            return self.request_structured_output(prompt)[0]
+        except AIProviderError as e:
+            logging.error(f"AI request failed: {e}")
+            return None
+
+    async def agenerate_structured_output(self, prompt: str):
+        """Async variant of generate_structured_output."""
+        try:
+            return (await self.arequest_structured_output(prompt))[0]
+        except AIProviderError as e:
+            logging.error(f"AI request failed: {e}")
+            return None
+
+    async def aclose(self):
+        """Releases async HTTP resources held by the provider."""
         pass
 
+class _PerLoopAsyncClient:
+    """
+    Holds an async HTTP client for the currently running event loop.
+    Pooled async connections are bound to the loop that opened them, and each
+    pipeline run uses a fresh loop (asyncio.run), so the client is recreated
+    whenever the loop changes.
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._loop = None
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = self._factory()
+            self._loop = loop
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            # httpx clients expose aclose(), AsyncOpenAI exposes an async close()
+            close = getattr(self._client, "aclose", None) or self._client.close
+            await close()
+        self._client = None
+        self._loop = None
+
 class GeminiClient(AIProvider):
     """AI Provider implementation for Google Gemini using direct REST API calls."""
-    def __init__(self, api_key: str, model_id: str):
+    provider_name = "gemini"
+
+    def __init__(self, api_key: str, model_id: str, api_base: str = GEMINI_API_BASE):
         self.api_key = api_key
         self.model_id = model_id
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_id}:generateContent?key={self.api_key}"
+        self.api_url = f"{api_base.rstrip('/')}/models/{self.model_id}:generateContent?key={self.api_key}"
+
+        # Keep-alive connection pools: one for blocking calls, one per event loop for async calls
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=AI_HTTP_POOL_SIZE))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=AI_HTTP_POOL_SIZE))
+        self._async_client = _PerLoopAsyncClient(lambda: httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=60,
+            limits=httpx.Limits(max_connections=AI_HTTP_POOL_SIZE, max_keepalive_connections=AI_HTTP_POOL_SIZE),
+        ))
         logging.info(f"GeminiClient (REST) initialized for model '{model_id}'.")
 
-    def generate_structured_output(self, prompt: str):
-        headers = {"Content-Type": "application/json"}
-        payload = {
+    @staticmethod
+    def _build_payload(prompt: str) -> dict:
+        return {
             "contents": [{
                 "parts": [{"text": prompt}]
             }],
@@ -42,90 +215,445 @@ class GeminiClient(AIProvider):
                 "response_mime_type": "application/json",
             }
         }
+
+    @staticmethod
+    def _rate_limit_info(headers, body: str) -> RateLimitInfo:
+        info = parse_rate_limit_headers(headers)
+        if info.retry_after is None and body:
+            # Gemini reports the suggested delay in the error body: {"@type": "...RetryInfo", "retryDelay": "30s"}
+            try:
+                details = json.loads(body).get("error", {}).get("details", [])
+                delays = [_parse_duration(d.get("retryDelay")) for d in details if isinstance(d, dict)]
+                info.retry_after = next((d for d in delays if d is not None), None)
+            except (ValueError, AttributeError):
+                pass
+        return info
+
+    def _handle_response(self, status_code: int, headers, body: str):
+        rate_limit = self._rate_limit_info(headers, body if status_code >= 400 else "")
+        _raise_for_status(status_code, body, rate_limit)
         try:
-            logging.info("Sending request to Gemini REST API...")
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=60)
-            response.raise_for_status() # Raise an exception for bad status codes
-            
-            logging.info("Received response from Gemini REST API.")
-            
             # Correctly parse the nested JSON structure from the response
-            response_data = response.json()
+            response_data = json.loads(body)
+            usage = response_data.get('usageMetadata') or {}
+            _record_token_usage(self.provider_name, usage.get('promptTokenCount'), usage.get('candidatesTokenCount'))
             text_content = response_data['candidates'][0]['content']['parts'][0]['text']
-            
-            return json.loads(text_content)
+            return json.loads(text_content), rate_limit
+        except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+            logging.error(f"Full response text: {body}")
+            raise AIProviderError(f"Failed to parse JSON from Gemini REST response: {e}", retryable=True)
+
+    def request_structured_output(self, prompt: str):
+        headers = {"Content-Type": "application/json"}
+        logging.info("Sending request to Gemini REST API...")
+        try:
+            response = self.session.post(self.api_url, headers=headers, json=self._build_payload(prompt), timeout=60)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            raise AIProviderError(f"Gemini REST API request failed: {e}", retryable=True)
         except requests.exceptions.RequestException as e:
-            logging.error(f"An error occurred with Gemini REST API: {e}")
-            # Try to get more details from the response if available
-            if e.response is not None:
-                logging.error(f"Response body: {e.response.text}")
-            return None
-        except (json.JSONDecodeError, KeyError, IndexError) as e:
-            logging.error(f"Failed to parse JSON from Gemini REST response: {e}")
-            logging.error(f"Full response text: {response.text}")
-            return None
+            raise AIProviderError(f"Gemini REST API request failed: {e}")
+        logging.info("Received response from Gemini REST API.")
+        return self._handle_response(response.status_code, response.headers, response.text)
+
+    async def arequest_structured_output(self, prompt: str):
+        logging.info("Sending async request to Gemini REST API...")
+        try:
+            response = await self._async_client.get().post(self.api_url, json=self._build_payload(prompt))
+        except httpx.TransportError as e:
+            raise AIProviderError(f"Gemini REST API request failed: {e!r}", retryable=True)
+        except httpx.HTTPError as e:
+            raise AIProviderError(f"Gemini REST API request failed: {e!r}")
+        logging.info("Received async response from Gemini REST API.")
+        return self._handle_response(response.status_code, response.headers, response.text)
+
+    async def aclose(self):
+        await self._async_client.aclose()
 
 class OpenAIClient(AIProvider):
     """AI Provider implementation for OpenAI-compatible APIs."""
+    provider_name = "openai"
+
     def __init__(self, api_key: str, model_id: str, base_url: str):
         if not openai:
             raise ImportError("The 'openai' library is required. Please install it.")
         try:
-            self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
+            # Retries are handled by ResilientAIClient, which also adapts concurrency
+            self.client = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
             self.model_id = model_id
+            self._async_client = _PerLoopAsyncClient(lambda: openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    http2=HTTP2_AVAILABLE,
+                    limits=httpx.Limits(max_connections=AI_HTTP_POOL_SIZE, max_keepalive_connections=AI_HTTP_POOL_SIZE),
+                ),
+            ))
             logging.info(f"OpenAIClient initialized for model '{model_id}' at '{base_url}'.")
         except Exception as e:
             logging.error(f"Failed to initialize OpenAIClient: {e}")
             raise
 
-    def generate_structured_output(self, prompt: str):
+    @staticmethod
+    def _parse_messages(prompt: str):
         """
         The 'prompt' is expected to be a JSON string representing a list of messages.
         Example: '[{"role": "system", "content": "..."}, {"role": "user", "content": "..."}]'
         """
         try:
-            messages = json.loads(prompt)
+            return json.loads(prompt)
         except json.JSONDecodeError:
             # Fallback for simple string prompts for backward compatibility or other use cases
-            messages = [{"role": "user", "content": prompt}]
+            return [{"role": "user", "content": prompt}]
+
+    @staticmethod
+    def _translate_error(e: Exception) -> AIProviderError:
+        """Maps SDK exceptions onto AIProviderError, keeping the rate-limit headers."""
+        if isinstance(e, openai.APIStatusError):
+            rate_limit = parse_rate_limit_headers(e.response.headers)
+            try:
+                _raise_for_status(e.status_code, str(e), rate_limit)
+            except AIProviderError as translated:
+                return translated
+        if isinstance(e, openai.APIConnectionError):  # includes timeouts
+            return AIProviderError(f"OpenAI-compatible API request failed: {e}", retryable=True)
+        return AIProviderError(f"An error occurred with OpenAI-compatible API: {e}")
+
+    def _handle_response(self, raw_response):
+        rate_limit = parse_rate_limit_headers(raw_response.headers)
+        content = None
+        try:
+            completion = raw_response.parse()
+            if completion.usage:
+                _record_token_usage(self.provider_name, completion.usage.prompt_tokens,
+                                    completion.usage.completion_tokens)
+            content = completion.choices[0].message.content
+            return json.loads(content), rate_limit
+        except (json.JSONDecodeError, TypeError, IndexError, AttributeError):
+            raise AIProviderError(f"Failed to decode JSON from OpenAI response: {content}", retryable=True)
 
+    def request_structured_output(self, prompt: str):
+        messages = self._parse_messages(prompt)
+        logging.info("Sending request to OpenAI-compatible API...")
         try:
-            logging.info("Sending request to OpenAI-compatible API...")
-            response = self.client.chat.completions.create(
+            raw_response = self.client.chat.completions.with_raw_response.create(
                 model=self.model_id,
                 messages=messages,
                 response_format={"type": "json_object"},
                 timeout=30.0  # Set a 30-second timeout
             )
-            logging.info("Received response from OpenAI-compatible API.")
-            
-            content = response.choices[0].message.content
-            return json.loads(content)
-        except json.JSONDecodeError:
-            logging.error(f"Failed to decode JSON from OpenAI response: {content}")
-            return None
-        except Exception as e:
-            logging.error(f"An error occurred with OpenAI-compatible API: {e}")
-            return None
+        except openai.OpenAIError as e:
+            raise self._translate_error(e)
+        logging.info("Received response from OpenAI-compatible API.")
+        return self._handle_response(raw_response)
 
-def get_ai_client() -> AIProvider:
+    async def arequest_structured_output(self, prompt: str):
+        messages = self._parse_messages(prompt)
+        logging.info("Sending async request to OpenAI-compatible API...")
+        try:
+            raw_response = await self._async_client.get().chat.completions.with_raw_response.create(
+                model=self.model_id,
+                messages=messages,
+                response_format={"type": "json_object"},
+                timeout=30.0
+            )
+        except openai.OpenAIError as e:
+            raise self._translate_error(e)
+        logging.info("Received async response from OpenAI-compatible API.")
+        return self._handle_response(raw_response)
+
+    async def aclose(self):
+        await self._async_client.aclose()
+
+    # --- Offline Batch API (/v1/batches), for large backfills ---
+
+    def build_batch_request(self, custom_id: str, prompt: str) -> dict:
+        """One line of a Batch API input file: the same request request_structured_output sends."""
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model_id,
+                "messages": self._parse_messages(prompt),
+                "response_format": {"type": "json_object"},
+            },
+        }
+
+    def submit_batch(self, batch_requests: list, metadata: dict = None) -> str:
+        """Uploads the requests as a JSONL file and creates a batch job. Returns the batch id."""
+        jsonl = "\n".join(json.dumps(r, ensure_ascii=False) for r in batch_requests).encode("utf-8")
+        input_file = self.client.files.create(file=("batch_input.jsonl", jsonl), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata=metadata,
+        )
+        logging.info(f"Submitted batch {batch.id} with {len(batch_requests)} requests.")
+        return batch.id
+
+    def get_batch(self, batch_id: str):
+        return self.client.batches.retrieve(batch_id)
+
+    def get_batch_results(self, batch) -> dict:
+        """
+        Downloads the output of a finished batch and returns {custom_id: parsed JSON};
+        requests that failed or returned malformed JSON map to None.
+        """
+        results = {}
+        if batch.error_file_id:
+            for line in self.client.files.content(batch.error_file_id).text.splitlines():
+                if line.strip():
+                    results[json.loads(line)["custom_id"]] = None
+        if not batch.output_file_id:
+            return results
+        for line in self.client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            try:
+                if response.get("status_code") != 200:
+                    raise ValueError(f"status {response.get('status_code')}")
+                content = response["body"]["choices"][0]["message"]["content"]
+                results[entry["custom_id"]] = json.loads(content)
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                logging.error(f"Batch request {entry.get('custom_id')} failed: {e}")
+                results[entry["custom_id"]] = None
+        return results
+
+class AdaptiveLimiter:
     """
-    Factory function to get the configured AI client.
+    AIMD concurrency limit for async calls to one provider: every success raises
+    the limit by 1/limit (about +1 per round of requests), a rate limit halves it
+    and pauses new requests until the provider's Retry-After has passed.
     """
-    if AI_PROVIDER.lower() == "gemini":
+    def __init__(self, initial: float, minimum: float = 1, maximum: float = None):
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = min(self.maximum, max(self.minimum, float(initial)))
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = None
+        self._loop = None
+
+    def _get_condition(self) -> asyncio.Condition:
+        # asyncio primitives are bound to one event loop; each pipeline run uses a new loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+            self.in_flight = 0
+        return self._condition
+
+    def pause_remaining(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    async def acquire(self):
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                pause = self.pause_remaining()
+                if pause > 0:
+                    try:
+                        await asyncio.wait_for(condition.wait(), pause)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    await condition.wait()
+            self.in_flight += 1
+
+    async def release(self):
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            condition.notify_all()
+
+    def _pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def record_success(self, rate_limit: RateLimitInfo):
+        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        if rate_limit.remaining_requests == 0 and rate_limit.reset_requests:
+            # Quota used up: wait for the reset instead of provoking a 429
+            self._pause(rate_limit.reset_requests)
+
+    def record_rate_limit(self, pause: float):
+        now = time.monotonic()
+        # Requests that were already in flight fail together; halve only once per burst
+        if now - self._last_decrease >= pause:
+            self.limit = max(self.minimum, self.limit / 2)
+            self._last_decrease = now
+            logging.warning(f"Rate limited, reducing AI concurrency limit to {self.limit:.1f}.")
+        self._pause(pause)
+
+class ResilientAIClient(AIProvider):
+    """
+    Controller around one or more providers (primary first, then the failover).
+    Retryable errors are retried with jittered exponential backoff that honours
+    Retry-After; async calls additionally go through a per-provider AIMD limiter.
+    When a provider keeps failing, or asks for a longer wait than AI_BACKOFF_MAX,
+    the request moves on to the next provider.
+
+    provider_name/model_id are those of the primary provider, so summary cache
+    keys don't change when a single request is served by the failover.
+    """
+    def __init__(self, providers: list, max_retries: int = AI_MAX_RETRIES,
+                 backoff_base: float = AI_BACKOFF_BASE, backoff_max: float = AI_BACKOFF_MAX,
+                 initial_concurrency: int = AI_CONCURRENCY, max_concurrency: int = AI_MAX_CONCURRENCY):
+        self.providers = providers
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiters = [AdaptiveLimiter(initial_concurrency, 1, max_concurrency) for _ in providers]
+
+    @property
+    def provider_name(self):
+        return self.providers[0].provider_name
+
+    @property
+    def model_id(self):
+        return self.providers[0].model_id
+
+    def _backoff(self, attempt: int, error: AIProviderError) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to give up on this provider."""
+        retry_after = error.rate_limit.retry_after
+        if retry_after is not None:
+            if retry_after > self.backoff_max:
+                return None
+            return retry_after + random.uniform(0, self.backoff_base)
+        # "Full jitter": spreads retries of concurrent requests over the whole window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _next_delay(self, provider: AIProvider, attempt: int, error: AIProviderError) -> Optional[float]:
+        if not error.retryable or attempt >= self.max_retries:
+            logging.warning(f"{provider.provider_name} request failed ({error}), giving up on this provider.")
+            return None
+        delay = self._backoff(attempt, error)
+        if delay is None:
+            logging.warning(f"{provider.provider_name} asked to wait {error.rate_limit.retry_after:.0f}s, giving up on this provider.")
+        else:
+            logging.warning(f"{provider.provider_name} request failed ({error}), retrying in {delay:.1f}s "
+                            f"(retry {attempt + 1}/{self.max_retries}).")
+        return delay
+
+    @staticmethod
+    def _observe_call(provider: AIProvider, start: float, error: AIProviderError = None):
+        outcome = "ok" if error is None else "rate_limited" if isinstance(error, RateLimitError) else "error"
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider.provider_name, outcome=outcome)
+
+    def request_structured_output(self, prompt: str):
+        last_error = None
+        for provider in self.providers:
+            for attempt in range(self.max_retries + 1):
+                start = time.perf_counter()
+                try:
+                    result = provider.request_structured_output(prompt)
+                    self._observe_call(provider, start)
+                    return result
+                except AIProviderError as e:
+                    self._observe_call(provider, start, e)
+                    last_error = e
+                    delay = self._next_delay(provider, attempt, e)
+                if delay is None:
+                    break
+                time.sleep(delay)
+        raise last_error
+
+    async def arequest_structured_output(self, prompt: str):
+        last_error = None
+        for provider, limiter in zip(self.providers, self.limiters):
+            for attempt in range(self.max_retries + 1):
+                await limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    result, rate_limit = await provider.arequest_structured_output(prompt)
+                    self._observe_call(provider, start)
+                    limiter.record_success(rate_limit)
+                    return result, rate_limit
+                except RateLimitError as e:
+                    self._observe_call(provider, start, e)
+                    last_error = e
+                    limiter.record_rate_limit(self._backoff(attempt, e) or self.backoff_max)
+                except AIProviderError as e:
+                    self._observe_call(provider, start, e)
+                    last_error = e
+                finally:
+                    await limiter.release()
+                delay = self._next_delay(provider, attempt, last_error)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        raise last_error
+
+    async def aclose(self):
+        for provider in self.providers:
+            await provider.aclose()
+
+def _create_provider(name: str) -> AIProvider:
+    if name == "gemini":
         if not GEMINI_API_KEY:
             raise ValueError("GEMINI_API_KEY is not configured in .env file.")
         return GeminiClient(api_key=GEMINI_API_KEY, model_id=GEMINI_MODEL_ID)
-    elif AI_PROVIDER.lower() == "openai":
+    elif name == "openai":
         if not OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY is not configured in .env file.")
         return OpenAIClient(api_key=OPENAI_API_KEY, model_id=OPENAI_MODEL_ID, base_url=OPENAI_API_BASE)
     else:
-        raise ValueError(f"Unsupported AI_PROVIDER specified in .env: {AI_PROVIDER}")
+        raise ValueError(f"Unsupported AI_PROVIDER specified in .env: {name}")
 
-# Initialize a global client instance
-try:
-    ai_client = get_ai_client()
-except (ValueError, ImportError) as e:
-    logging.error(f"Could not initialize AI client: {e}")
-    ai_client = None
+def get_ai_client() -> AIProvider:
+    """
+    Factory function to get the configured AI client: the AI_PROVIDER client,
+    plus the AI_FAILOVER_PROVIDER client if one is configured, wrapped in a
+    ResilientAIClient.
+    """
+    providers = [_create_provider(AI_PROVIDER.lower())]
+    failover = AI_FAILOVER_PROVIDER.lower()
+    if failover and failover != providers[0].provider_name:
+        try:
+            providers.append(_create_provider(failover))
+            logging.info(f"Using '{failover}' as the failover AI provider.")
+        except (ValueError, ImportError) as e:
+            logging.warning(f"Could not initialize failover AI provider '{failover}': {e}")
+    return ResilientAIClient(providers)
+
+# The shared client is created on first use, so importing this module (e.g. from
+# the web process) neither validates the configuration nor opens any connections.
+_default_client = None
+_default_client_ready = False
+_default_client_lock = threading.Lock()
+
+def get_default_client() -> Optional[AIProvider]:
+    """
+    Returns the shared AI client, creating it on the first call.
+    Returns None when the configuration is invalid.
+    """
+    global _default_client, _default_client_ready
+    if not _default_client_ready:
+        with _default_client_lock:
+            if not _default_client_ready:
+                try:
+                    _default_client = get_ai_client() if validate_config() else None
+                except (ValueError, ImportError) as e:
+                    logging.error(f"Could not initialize AI client: {e}")
+                    _default_client = None
+                _default_client_ready = True
+    return _default_client
+
+def set_default_client(client: Optional[AIProvider]):
+    """Replaces the shared AI client (benchmarks use this to inject a fake provider)."""
+    global _default_client, _default_client_ready
+    with _default_client_lock:
+        _default_client = client
+        _default_client_ready = True
+
+def __getattr__(name):
+    # Keeps `from app.core.ai_provider import ai_client` working
+    if name == "ai_client":
+        return get_default_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
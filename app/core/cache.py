@@ -0,0 +1,102 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import API_CACHE_MAX_ENTRIES, DATASET_VERSION_TTL
+from app.core.database import ReadSessionLocal
+from app.crud.dataset import get_dataset_version
+
+# 文章数据只在数据管道提交时才会变化，因此接口响应可以按数据集版本号缓存：
+# 版本号变化后旧的缓存键自然失效，不需要逐条清理。
+
+
+class ResponseCache:
+    """
+    线程安全的 LRU 响应缓存，保存序列化好的响应体。
+    """
+    def __init__(self, max_entries: int = API_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+article_page_cache = ResponseCache()
+
+_version_lock = threading.Lock()
+_cached_version = None
+_version_checked_at = 0.0
+
+
+def current_dataset_version() -> int:
+    """
+    返回当前数据集版本号。
+    结果在 DATASET_VERSION_TTL 秒内复用，流量高峰时也最多每个间隔查询一次数据库。
+    """
+    global _cached_version, _version_checked_at
+    with _version_lock:
+        if _cached_version is not None and time.monotonic() - _version_checked_at < DATASET_VERSION_TTL:
+            return _cached_version
+
+    db = ReadSessionLocal()
+    try:
+        version = get_dataset_version(db)
+    finally:
+        db.close()
+
+    with _version_lock:
+        if version != _cached_version:
+            article_page_cache.clear()
+        _cached_version = version
+        _version_checked_at = time.monotonic()
+    return version
+
+
+def invalidate_dataset_version():
+    """让下一次 current_dataset_version() 立即重新读取数据库，例如在数据管道运行结束后调用。"""
+    global _version_checked_at
+    with _version_lock:
+        _version_checked_at = 0.0
+
+
+# 预压缩的响应体与原始响应体字节不同，ETag 中带上编码后缀，各自是独立的表示
+_ETAG_ENCODING_SUFFIXES = {"br": "br", "gzip": "gz"}
+
+
+def make_etag(version: int, *key_parts, encoding: str = None) -> str:
+    """
+    根据数据集版本号和请求参数生成 ETag，同一版本下相同参数的响应内容不变。
+    encoding 为响应的 Content-Encoding，压缩过的响应得到带 -br / -gz 后缀的 ETag。
+    """
+    digest = hashlib.sha1(repr(key_parts).encode("utf-8")).hexdigest()[:16]
+    suffix = f"-{_ETAG_ENCODING_SUFFIXES[encoding]}" if encoding else ""
+    return f'"v{version}-{digest}{suffix}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    判断请求头 If-None-Match 是否命中当前 ETag（忽略弱校验前缀 W/）。
+    etag 应为本次将要发送的编码对应的 ETag，其他编码的 ETag 不会命中。
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
@@ -13,17 +13,128 @@ AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini").lower()
 # --- Gemini Specific ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL_ID = os.getenv("GEMINI_MODEL_ID", "gemini-1.5-flash-latest")
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
 
 # --- OpenAI Specific ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1") # Default to official API
 OPENAI_MODEL_ID = os.getenv("OPENAI_MODEL_ID", "gpt-4o")
 
+# --- Database ---
+# SQLite 连接参数：busy_timeout 让并发的写事务排队等待，而不是立即报 "database is locked"；
+# cache_size 为每个连接的页缓存大小 (KiB)，mmap_size 为通过内存映射读取的字节数上限
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+# API 读请求使用的只读连接池大小（另外最多允许同样数量的临时连接）
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "8"))
+# PostgreSQL 连接池的大小、溢出上限和连接回收时间（秒）
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# 可选的 PostgreSQL 只读副本地址，API 读请求走副本；留空则读写共用 DATABASE_URL
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+
+# --- Summary Cache ---
+# 是否缓存 AI 总结结果，相同内容再次总结时不再调用 LLM
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# --- Near-duplicate Detection ---
+# 是否在调用 LLM 前检测近似重复的文章（转载、同步发布等），重复文章直接关联到已有文章并复用其摘要
+DUPLICATE_DETECTION = os.getenv("DUPLICATE_DETECTION", "true").lower() in ("1", "true", "yes")
+# 两篇文章 SimHash 指纹的海明距离不超过该值即视为近似重复（0-63，越大越宽松）
+DUPLICATE_MAX_DISTANCE = int(os.getenv("DUPLICATE_MAX_DISTANCE", "3"))
+
+# --- AI HTTP clients ---
+# 每个 AI 客户端连接池中保持的最大连接数，应不小于 AI_MAX_CONCURRENCY
+AI_HTTP_POOL_SIZE = int(os.getenv("AI_HTTP_POOL_SIZE", "16"))
+
+# --- AI Rate Limiting ---
+# 主服务商持续失败（限流、超时、5xx）时改用的备用服务商 (gemini/openai)，留空表示不切换
+AI_FAILOVER_PROVIDER = os.getenv("AI_FAILOVER_PROVIDER", "").lower()
+# 每个服务商的最大重试次数，以及带随机抖动的指数退避的基数和上限（秒）；
+# 服务商要求等待的时间超过上限时直接切换到备用服务商
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "4"))
+AI_BACKOFF_BASE = float(os.getenv("AI_BACKOFF_BASE", "1.0"))
+AI_BACKOFF_MAX = float(os.getenv("AI_BACKOFF_MAX", "30"))
+
+# --- Summarizer ---
+# 单次 AI 请求中文章内容的估算 token 上限；超出时改为分块总结后再合并 (map-reduce)
+LLM_MAX_INPUT_TOKENS = int(os.getenv("LLM_MAX_INPUT_TOKENS", "8000"))
+# 分块总结时最多处理的分块数，用于限制单篇超长文章的调用成本
+LLM_MAX_CHUNKS = int(os.getenv("LLM_MAX_CHUNKS", "6"))
+# 批量模式下每个请求最多打包的文章数，1 表示关闭批量模式（每篇文章单独请求）
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "1"))
+# 估算 token 数超过该值的文章不参与打包，单独总结
+LLM_BATCH_MAX_ARTICLE_TOKENS = int(os.getenv("LLM_BATCH_MAX_ARTICLE_TOKENS", "1500"))
+
+# --- Pipeline ---
+# 是否使用并发流水线（抓取与 AI 总结分别由有界的 worker 池处理）
+PIPELINE_CONCURRENT = os.getenv("PIPELINE_CONCURRENT", "false").lower() in ("1", "true", "yes")
+# 同时抓取文章内容的 worker 数量
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", "4"))
+# 调用 AI 接口的初始并发数；运行中按 AIMD 自适应调整：请求成功时逐步增加，被限流时减半
+AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "2"))
+# 自适应并发数的上限，也是并发流水线中 AI 总结 worker 的数量
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+# 每个数据库写入事务最多包含的文章数量
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "20"))
+# 是否在每次运行时刷新已有文章：重新抓取正文，只有规范化正文的哈希变化时才重新调用 AI 总结
+PIPELINE_REFRESH = os.getenv("PIPELINE_REFRESH", "false").lower() in ("1", "true", "yes")
+# 刷新模式下，距离上次抓取超过多少小时的文章才会被重新抓取
+REFRESH_INTERVAL_HOURS = float(os.getenv("REFRESH_INTERVAL_HOURS", "24"))
+# 手动触发数据管道 (POST /api/pipeline/run) 所需的令牌，请求需带 "Authorization: Bearer <令牌>"；
+# 每次运行都会调用付费的 LLM 接口，因此未设置时该接口禁用
+PIPELINE_ADMIN_TOKEN = os.getenv("PIPELINE_ADMIN_TOKEN", "")
+
+# --- Timeline Snapshots ---
+# 每次数据管道运行结束后预先渲染并压缩的文章页数，首页和前几页直接以静态文件返回；0 表示关闭
+SNAPSHOT_PAGES = int(os.getenv("SNAPSHOT_PAGES", "5"))
+# 快照的每页文章数，应与前端每次加载的数量一致
+SNAPSHOT_PAGE_SIZE = int(os.getenv("SNAPSHOT_PAGE_SIZE", "10"))
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "./data/snapshots")
+
+# --- Article Stream ---
+# /api/stream 检查是否有新文章的间隔（秒）；每个进程只有一个后台任务在检查，与连接数无关
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "2"))
+# 没有新文章时发送心跳注释的间隔（秒），避免代理因连接空闲而将其断开
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+# 每个连接最多积压的未发送事件数，超出时断开该连接，由浏览器重连后补发
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "100"))
+# 重连时根据 Last-Event-ID 最多补发的文章数
+STREAM_REPLAY_LIMIT = int(os.getenv("STREAM_REPLAY_LIMIT", "100"))
+
+# --- Scheduler ---
+# 跨进程文件锁所在目录。uvicorn 以多个 worker 运行时，只有持有调度锁的进程执行定时任务，
+# 数据管道本身也持有一把锁，保证同一时间只有一次运行（需要所有进程共享同一个目录）
+LOCK_DIR = os.getenv("LOCK_DIR", "./data/locks")
+# 未成为调度主进程的 worker 每隔多少秒尝试接管一次（主进程退出后由它们接替）
+LEADER_RETRY_SECONDS = int(os.getenv("LEADER_RETRY_SECONDS", "30"))
+
+# --- Scraper ---
+# 对同一站点每秒最多发起的请求数（令牌桶速率）以及允许的突发请求数
+SCRAPER_RATE_PER_HOST = float(os.getenv("SCRAPER_RATE_PER_HOST", "2"))
+SCRAPER_BURST = int(os.getenv("SCRAPER_BURST", "4"))
+# 遇到 429/5xx 或连接错误时的最大重试次数，以及指数退避的基数（秒）
+SCRAPER_MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "3"))
+SCRAPER_BACKOFF_FACTOR = float(os.getenv("SCRAPER_BACKOFF_FACTOR", "0.5"))
+# 条件请求 (ETag/Last-Modified) 的本地页面缓存目录及容量上限，容量设为 0 表示关闭缓存
+SCRAPER_CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", "./data/http_cache")
+SCRAPER_CACHE_MAX_MB = float(os.getenv("SCRAPER_CACHE_MAX_MB", "256"))
+
+# --- API Cache ---
+# 浏览器/CDN 可以直接复用文章接口响应的秒数，过期后通过 ETag 重新验证
+API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "60"))
+# 进程内缓存的文章分页响应数量上限
+API_CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", "256"))
+# 重新从数据库读取数据集版本号的间隔（秒）
+DATASET_VERSION_TTL = float(os.getenv("DATASET_VERSION_TTL", "2"))
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def validate_config():
-    """检查关键配置是否存在"""
+    """检查关键配置是否存在。不在导入时执行，由首次创建 AI 客户端时调用。"""
     logging.info(f"Selected AI Provider: {AI_PROVIDER}")
     if AI_PROVIDER == "gemini":
         if not GEMINI_API_KEY:
@@ -36,9 +147,8 @@ def validate_config():
             return False
         logging.info(f"Using OpenAI Model: {OPENAI_MODEL_ID}")
         logging.info(f"Using OpenAI API Base: {OPENAI_API_BASE}")
+    if AI_FAILOVER_PROVIDER:
+        logging.info(f"Failover AI Provider: {AI_FAILOVER_PROVIDER}")
     
     logging.info("Configuration loaded successfully.")
     return True
-
-# 在模块加载时执行验证
-is_config_valid = validate_config()
@@ -1,8 +1,17 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.core.config import (
+    DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_READ_POOL_SIZE,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DATABASE_READ_URL
+)
+from app.core.locks import ProcessLock
+from app.core.metrics import instrument_engine
+from app.core.search import register_search_functions
+
 # 获取项目根目录
 # /home/baby/www/service/zhishi-collect/app/core/database.py -> /home/baby/www/service/zhishi-collect
 # os.path.dirname() 会返回当前文件所在的目录
@@ -14,27 +23,139 @@ from sqlalchemy.orm import sessionmaker
 # 这里我们用一个简单的方式，假设我们的工作目录是项目根目录
 # 在生产环境中，这个路径应该通过配置管理
 # 在容器内，我们将把数据库文件放在 /app/data/ 目录下
-DATABASE_URL = "sqlite:///./data/aiview.db"
+# 可以通过环境变量 DATABASE_URL 覆盖，例如基准测试使用单独生成的数据库
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/aiview.db")
 
-# 创建 SQLAlchemy 引擎
-# connect_args 是 SQLite 特有的配置，允许多个线程共享同一个连接
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def _set_sqlite_pragmas(engine, read_only: bool):
+    """
+    在每个新建的 SQLite 连接上设置 PRAGMA。
+    WAL 模式下读操作不会被写事务阻塞（反之亦然），数据管道夜间写入时 API 的读延迟保持稳定；
+    WAL 下 synchronous=NORMAL 仍能保证数据库不损坏，只是断电时可能丢失最后几个事务。
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+            if read_only:
+                # 只读连接拒绝任何写操作，误用时会立即报错
+                cursor.execute("PRAGMA query_only = ON")
+            else:
+                # journal_mode 记录在数据库文件中，由写连接设置一次即对所有连接生效
+                cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+            cursor.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+            cursor.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+        finally:
+            cursor.close()
+
+def _create_engines(url: str):
+    """
+    返回 (写引擎, 读引擎)。
+    SQLite：写引擎供数据管道和脚本使用，写事务由 SQLite 的单写锁串行执行，busy_timeout 让后来者排队；
+    读引擎是单独的只读连接池，只供 API 使用。
+    PostgreSQL 等其他数据库：使用调优过的连接池，配置了 DATABASE_READ_URL 时读请求走只读副本。
+    """
+    if make_url(url).get_backend_name() != "sqlite":
+        pool_args = dict(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                         pool_pre_ping=True, pool_recycle=DB_POOL_RECYCLE)
+        write_engine = create_engine(url, **pool_args)
+        read_engine = create_engine(DATABASE_READ_URL, **pool_args) if DATABASE_READ_URL else write_engine
+        return write_engine, read_engine
+
+    # check_same_thread=False 允许连接在线程间传递（连接池和 FastAPI 的线程池需要）
+    connect_args = {"check_same_thread": False}
+    write_engine = create_engine(url, connect_args=connect_args)
+    # 全文检索的触发器在写入文章时调用 cjk_bigrams()
+    register_search_functions(write_engine)
+    if make_url(url).database in (None, "", ":memory:"):
+        # 内存数据库无法被第二个连接池共享
+        return write_engine, write_engine
+    _set_sqlite_pragmas(write_engine, read_only=False)
+    read_engine = create_engine(url, connect_args=connect_args,
+                                pool_size=DB_READ_POOL_SIZE, max_overflow=DB_READ_POOL_SIZE)
+    _set_sqlite_pragmas(read_engine, read_only=True)
+    return write_engine, read_engine
 
-# 创建一个 SessionLocal 类，每个实例都将是一个数据库会话
+# 创建 SQLAlchemy 引擎：engine 用于写入（以及建表、迁移等），read_engine 用于 API 读请求
+engine, read_engine = _create_engines(DATABASE_URL)
+# 记录每条 SQL 语句的耗时，见 /api/metrics
+instrument_engine(engine)
+if read_engine is not engine:
+    instrument_engine(read_engine)
+
+# 创建一个 SessionLocal 类，每个实例都将是一个数据库会话；
+# ReadSessionLocal 的会话只能读，供 API 请求使用
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # 创建一个 Base 类，我们的 ORM 模型将继承这个类
 Base = declarative_base()
 
 def get_db():
     """
-    FastAPI 依赖注入函数，用于获取数据库会话。
+    FastAPI 依赖注入函数，用于获取（只读的）数据库会话。
     它确保数据库会话在请求处理完毕后总是被关闭。
     """
-    db = SessionLocal()
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def init_db():
+    """
+    创建所有数据表，并为已存在的表补齐后来新增的列和索引。
+    create_all 只会创建缺失的表，不会给已有的表添加新列和新索引，因此这里逐个检查。
+    """
+    # 多个 worker 同时启动时逐个执行，避免并发建表时报 "table already exists"
+    lock = ProcessLock("init_db")
+    lock.acquire(blocking=True)
+    try:
+        _create_schema()
+    finally:
+        lock.release()
+
+def _add_missing_columns():
+    """
+    为已存在的表补齐模型中后来新增的列（create_all 不会修改已有的表）。
+    新增的列都允许为空，旧数据的值为 NULL。
+    只补列本身，不补约束：例如旧库中补上的 articles.duplicate_of_id 只是普通的 INTEGER 列，
+    没有指向 articles.id 的外键，删除原文时也不会自动置为 NULL（ondelete="SET NULL" 不生效），
+    只有新建的数据库才带有该外键。
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+
+def _create_schema():
+    # 导入模型，确保它们已注册到 Base.metadata
+    from app.models import article, dataset, summary_cache  # noqa: F401
+
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    # 创建全文检索索引及同步触发器
+    from app.core.search import ensure_search_index
+    ensure_search_index(engine)
+
+    # 为旧数据补齐 article_skills 表
+    from app.crud.article import backfill_article_skills
+    db = SessionLocal()
+    try:
+        backfill_article_skills(db)
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import signal
+
+from app.core.cache import current_dataset_version
+from app.core.config import STREAM_POLL_SECONDS, STREAM_QUEUE_SIZE, STREAM_REPLAY_LIMIT
+from app.core.database import ReadSessionLocal
+from app.crud import article as crud_article
+from app.schemas.article import ArticleOut
+
+# 数据管道运行在独立的子进程中（多 worker 部署时甚至可能由另一个 worker 触发），
+# 无法直接调用 Web 进程里的函数。因此每个 Web 进程由一个后台任务观察数据集版本号：
+# 管道每次提交新文章都会递增版本号，版本号变化后读取新增的文章，再分发给本进程的所有 SSE 连接。
+# 数据库查询次数只与检查间隔有关，与在线的连接数无关。
+
+# 放入订阅者队列的结束标记，表示该连接应当断开：队列已满（客户端读得太慢）或服务正在关闭。
+# 浏览器重连后通过 Last-Event-ID 补发错过的文章
+END_OF_STREAM = object()
+
+
+def format_event(article: ArticleOut) -> str:
+    """按 SSE 格式编码一篇文章；事件 id 为文章 id，浏览器重连时会通过 Last-Event-ID 带回。"""
+    return f"id: {article.id}\nevent: article\ndata: {article.model_dump_json()}\n\n"
+
+
+def load_articles_after(after_id: int, limit: int = STREAM_REPLAY_LIMIT) -> list:
+    """读取 id 大于 after_id 的文章（按写入顺序），返回已编码的事件。"""
+    db = ReadSessionLocal()
+    try:
+        articles = crud_article.get_articles_after_id(db, after_id, limit=limit)
+        return [(article.id, format_event(ArticleOut.model_validate(article))) for article in articles]
+    finally:
+        db.close()
+
+
+def _load_max_article_id() -> int:
+    db = ReadSessionLocal()
+    try:
+        return crud_article.get_max_article_id(db)
+    finally:
+        db.close()
+
+
+class ArticleBroker:
+    """
+    进程内的发布/订阅。
+    每个 SSE 连接订阅一个有界队列；新文章的事件只编码一次，以 (文章 id, 事件) 放入所有队列。
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._last_id = 0
+        self._task = None
+        self._closed = False
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        if self._closed:
+            queue.put_nowait(END_OF_STREAM)
+        else:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, article_id: int, event: str):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait((article_id, event))
+            except asyncio.QueueFull:
+                # 客户端读得太慢：不再为它积压事件，断开连接
+                self._end(queue)
+
+    def _end(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(END_OF_STREAM)
+
+    def close(self):
+        """结束所有 SSE 连接，之后的订阅也会立即结束。"""
+        self._closed = True
+        for queue in list(self._subscribers):
+            self._end(queue)
+
+    async def _watch(self):
+        version = None
+        while True:
+            try:
+                new_version = await asyncio.to_thread(current_dataset_version)
+                if version is None:
+                    self._last_id = await asyncio.to_thread(_load_max_article_id)
+                elif new_version != version:
+                    # 一次写入可能超过 STREAM_REPLAY_LIMIT 篇，循环读到没有新文章为止
+                    while True:
+                        events = await asyncio.to_thread(load_articles_after, self._last_id)
+                        for article_id, event in events:
+                            self.publish(article_id, event)
+                            self._last_id = article_id
+                        if len(events) < STREAM_REPLAY_LIMIT:
+                            break
+                version = new_version
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"检查新文章失败: {e}")
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+
+    def start(self):
+        """在 Web 应用启动时调用，开始观察新写入的文章。"""
+        self._closed = False
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+        self._close_on_exit_signal()
+
+    def _close_on_exit_signal(self):
+        """
+        uvicorn 收到退出信号后会等所有请求结束才执行 lifespan 的关闭逻辑，
+        而 SSE 连接不会自己结束。因此在 uvicorn 的信号处理函数之前先结束所有连接。
+        """
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(sig)
+            if not callable(previous):
+                continue
+
+            def handler(signum, frame, previous=previous):
+                loop.call_soon_threadsafe(self.close)
+                previous(signum, frame)
+
+            try:
+                signal.signal(sig, handler)
+            except ValueError:
+                # 只能在主线程中设置信号处理函数（例如 TestClient 在其他线程中运行应用）
+                return
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._subscribers.clear()
+
+
+article_broker = ArticleBroker()
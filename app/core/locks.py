@@ -0,0 +1,64 @@
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from app.core.config import LOCK_DIR
+
+
+class ProcessLock:
+    """
+    基于 flock 的跨进程非阻塞文件锁。
+    锁由操作系统随文件描述符一起释放，持有锁的进程崩溃或被杀死后不会留下死锁，
+    其他进程的下一次 acquire() 就能成功。
+    同一个 ProcessLock 对象已持有锁时再次 acquire() 不做任何事，直接返回 True；
+    锁不计数，之后调用一次 release() 就会释放锁。
+
+    没有 fcntl 的平台（Windows）上无法加锁：acquire() 总是成功，锁对象只记录 _unlocked 标记。
+    此时调度器选主、数据管道互斥和 init_db 串行化都不成立，只能以单个 worker 进程部署。
+    """
+
+    def __init__(self, name: str, lock_dir: str = None):
+        self.path = os.path.join(lock_dir or LOCK_DIR, f"{name}.lock")
+        self._file = None
+        # 在没有 fcntl 的平台上"获取"了锁，实际上没有任何跨进程互斥
+        self._unlocked = False
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None or self._unlocked
+
+    def acquire(self, blocking: bool = False) -> bool:
+        """尝试获取锁，获取成功返回 True；blocking 为 True 时一直等到其他进程释放。"""
+        if self.held:
+            return True
+        if fcntl is None:
+            logging.warning(f"当前平台不支持 fcntl 文件锁，{self.path} 不提供跨进程互斥，"
+                            f"请只启动一个 worker 进程。")
+            self._unlocked = True
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock_file = open(self.path, "a+")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        # 记录持有者的 PID，便于排查
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        self._unlocked = False
+        if self._file is None:
+            return
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
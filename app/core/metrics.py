@@ -0,0 +1,235 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+# 轻量的进程内指标（计数器和直方图），以 Prometheus 文本格式在 /api/metrics 输出。
+# 数据管道运行在单独的子进程中，子进程在每次运行结束后把自己的指标快照交回 Web 进程合并，
+# 因此不依赖 prometheus_client 的多进程模式。
+
+# 秒为单位的默认桶，覆盖从毫秒级的数据库查询到数十秒的 LLM 调用
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def snapshot(self, reset: bool = False) -> dict:
+        with self._lock:
+            values = {key: self._copy(value) for key, value in self._values.items()}
+            if reset:
+                self._values.clear()
+        return values
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(_Metric):
+    """只增不减的计数器。"""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def merge(self, values: dict):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> list:
+        return [f"{self.name}{_format_labels(key)} {_format_number(value)}"
+                for key, value in sorted(self.snapshot().items())]
+
+
+class Histogram(_Metric):
+    """按桶统计观测值分布的直方图，同时记录总和与次数。"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    @staticmethod
+    def _copy(value):
+        counts, total, count = value
+        return list(counts), total, count
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        # bisect_left: 等于桶上限的值计入该桶 (le)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        """统计 with 代码块的耗时（秒），代码块抛出异常时同样记录。"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def merge(self, values: dict):
+        with self._lock:
+            for key, (counts, total, count) in values.items():
+                current = self._values.get(key)
+                if current is None:
+                    self._values[key] = (list(counts), total, count)
+                else:
+                    merged = [a + b for a, b in zip(current[0], counts)]
+                    self._values[key] = (merged, current[1] + total, current[2] + count)
+
+    def render(self) -> list:
+        lines = []
+        for key, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """保存本进程内的全部指标，并负责快照、合并和 Prometheus 文本输出。"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self, reset: bool = False) -> dict:
+        """返回可以在进程间传递（可 pickle）的指标数据；reset 为 True 时同时清零。"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot(reset) for metric in metrics}
+
+    def merge(self, snapshot: dict):
+        """把另一个进程的快照累加到本进程的指标上。"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        for name, values in snapshot.items():
+            if name in metrics:
+                metrics[name].merge(values)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- 数据管道 ---
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds",
+    "Time spent in each pipeline stage (listing_fetch, content_fetch, parse, llm, db_write).",
+    ("stage",),
+)
+PIPELINE_RUNS = REGISTRY.counter(
+    "pipeline_runs_total", "Finished pipeline runs by result.", ("status",)
+)
+PIPELINE_ARTICLES = REGISTRY.counter(
+    "pipeline_articles_total", "Articles handled by the pipeline (new and refreshed), by outcome.", ("outcome",)
+)
+
+# --- LLM ---
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_duration_seconds", "Latency of single LLM API calls.", ("provider", "outcome"),
+)
+LLM_TOKENS = REGISTRY.counter(
+    "llm_tokens_total", "Tokens reported by the LLM provider.", ("provider", "kind")
+)
+
+# --- Web API ---
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests by route.", ("method", "route", "status"),
+)
+
+# --- 数据库 ---
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "db_query_duration_seconds", "Latency of SQL statements by operation.", ("operation",),
+)
+
+
+def instrument_engine(engine):
+    """通过 SQLAlchemy 的 cursor 事件记录每条 SQL 语句的耗时，按语句类型 (SELECT/INSERT...) 分组。"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_times")
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+        DB_QUERY_SECONDS.observe(elapsed, operation=operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        # 出错的语句不会触发 after_cursor_execute，丢弃对应的开始时间
+        start_times = context.connection.info.get("query_start_times") if context.connection else None
+        if start_times:
+            start_times.pop()
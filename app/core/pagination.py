@@ -0,0 +1,24 @@
+import base64
+import json
+from datetime import datetime
+
+
+def encode_cursor(published_date: datetime, article_id: int) -> str:
+    """
+    将上一页最后一篇文章的 (published_date, id) 编码为不透明的游标字符串。
+    """
+    raw = json.dumps([published_date.isoformat(), article_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    解析游标字符串，返回 (published_date, id)。
+    游标格式不正确时抛出 ValueError。
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        published_date, article_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(published_date), int(article_id)
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
@@ -0,0 +1,121 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from app.core.cache import invalidate_dataset_version
+from app.core.locks import ProcessLock
+from app.core.metrics import REGISTRY, PIPELINE_RUNS
+
+# 数据管道包含阻塞的网络请求、HTML 解析和 LLM 调用，
+# 因此不在 Web 进程的事件循环里运行，而是交给一个独立的子进程执行。
+# Web 进程只负责触发运行和汇报状态。
+
+_executor = None
+_lock = threading.Lock()
+_current_future = None
+_status = {
+    "state": "idle",          # idle | running | succeeded | failed | skipped
+    "trigger": None,          # schedule | manual
+    "started_at": None,
+    "finished_at": None,
+    "articles_processed": None,
+    "error": None,
+}
+
+
+class PipelineBusyError(Exception):
+    """其他进程持有管道锁，本次运行被跳过。"""
+
+
+def _run_pipeline_in_worker():
+    """
+    在子进程中执行的入口。
+    管道模块在这里才导入，Web 进程本身不会加载爬虫、AI 客户端等重量级依赖。
+    返回 (处理的文章数, 本次运行的指标快照)，快照由 Web 进程合并后在 /api/metrics 输出。
+    管道出错时异常会传回 Web 进程，运行状态记为 failed。
+    """
+    # 多个 Web worker（或命令行）可能同时触发，同一时间只允许一次运行
+    lock = ProcessLock("pipeline")
+    if not lock.acquire():
+        raise PipelineBusyError("另一个进程正在运行数据管道")
+    try:
+        from scripts.run_pipeline import main_pipeline
+        articles_processed = main_pipeline()
+    except Exception:
+        # 失败的运行不会返回快照，清零后再抛出，避免这些数值混入下一次运行
+        REGISTRY.snapshot(reset=True)
+        raise
+    finally:
+        lock.release()
+    # 子进程会被复用，取快照的同时清零，避免下次运行重复累加
+    return articles_processed, REGISTRY.snapshot(reset=True)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # 使用 spawn 而不是 fork，避免子进程继承 uvicorn 的事件循环和数据库连接
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _on_pipeline_done(future):
+    # 管道可能写入了新文章，让接口缓存立即重新检查数据集版本号
+    invalidate_dataset_version()
+    with _lock:
+        _status["finished_at"] = datetime.now().isoformat()
+        try:
+            articles_processed, metrics_snapshot = future.result()
+            REGISTRY.merge(metrics_snapshot)
+            _status["articles_processed"] = articles_processed
+            _status["state"] = "succeeded"
+        except PipelineBusyError as e:
+            logging.info(f"跳过本次数据管道运行: {e}")
+            _status["state"] = "skipped"
+            _status["error"] = str(e)
+        except Exception as e:
+            logging.error(f"数据管道子进程执行失败: {e}")
+            _status["state"] = "failed"
+            _status["error"] = str(e)
+        PIPELINE_RUNS.inc(status=_status["state"])
+
+
+def trigger_pipeline_run(trigger: str = "manual") -> bool:
+    """
+    在子进程中启动一次数据管道运行，立即返回。
+    如果已有一次运行尚未结束，则不会重复启动，返回 False。
+    """
+    global _current_future
+    with _lock:
+        if _current_future is not None and not _current_future.done():
+            logging.info("数据管道正在运行中，忽略本次触发。")
+            return False
+
+        logging.info(f"触发数据管道运行 (trigger={trigger})...")
+        _status.update({
+            "state": "running",
+            "trigger": trigger,
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "articles_processed": None,
+            "error": None,
+        })
+        _current_future = _get_executor().submit(_run_pipeline_in_worker)
+    _current_future.add_done_callback(_on_pipeline_done)
+    return True
+
+
+def get_pipeline_status() -> dict:
+    """返回最近一次数据管道运行的状态快照。"""
+    with _lock:
+        return dict(_status)
+
+
+def shutdown_pipeline_runner():
+    """关闭子进程池。正在运行的管道会被放弃，不会阻塞 Web 进程退出。"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
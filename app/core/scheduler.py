@@ -1,15 +1,18 @@
 import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 import sys
 import os
 
-# 确保脚本可以找到 'scripts' 目录
+# 确保管道子进程可以找到 'scripts' 目录
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from scripts.run_pipeline import main_pipeline
+from app.core.pipeline_runner import trigger_pipeline_run, shutdown_pipeline_runner
+from app.core.config import LEADER_RETRY_SECONDS
+from app.core.locks import ProcessLock
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,30 +20,62 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # 初始化调度器
 scheduler = AsyncIOScheduler()
 
+# uvicorn 以多个 worker 运行时，每个 worker 都会启动调度器，
+# 只有持有这把锁的进程（调度主进程）注册定时任务，其余进程只处理 API 请求
+_leader_lock = ProcessLock("scheduler")
+
 def schedule_pipeline_job():
     """
     定义并添加周期性执行数据管道的任务。
+    任务本身只负责触发，管道在独立的子进程中运行，不会阻塞 Web 服务的事件循环。
     """
     logging.info("正在设置定时任务：每天晚上 23:00 运行一次数据管道...")
     
     # 使用 CronTrigger 来设置每天固定的执行时间
     scheduler.add_job(
-        main_pipeline,
+        trigger_pipeline_run,
         trigger=CronTrigger(hour=23, minute=0),
+        kwargs={"trigger": "schedule"},
         id="pipeline_job",
         name="Run data pipeline every day at 23:00",
         replace_existing=True
     )
 
+def _try_become_leader() -> bool:
+    """尝试获取调度锁；成功后注册定时任务，并停止后续的接管尝试。"""
+    if not _leader_lock.acquire():
+        return False
+    logging.info(f"进程 {os.getpid()} 成为调度主进程。")
+    if scheduler.get_job("leader_election"):
+        scheduler.remove_job("leader_election")
+    schedule_pipeline_job()
+    return True
+
+def is_scheduler_leader() -> bool:
+    """当前进程是否负责执行定时任务"""
+    return _leader_lock.held
+
 def start_scheduler():
-    """启动调度器"""
+    """
+    启动调度器。
+    只有成为调度主进程时才注册定时任务；其他进程定期重试，主进程退出后由其中一个接替。
+    """
+    if not _try_become_leader():
+        logging.info(f"其他进程正在执行定时任务，进程 {os.getpid()} 只处理 API 请求，"
+                     f"每 {LEADER_RETRY_SECONDS} 秒尝试接管一次。")
+        scheduler.add_job(
+            _try_become_leader,
+            trigger=IntervalTrigger(seconds=LEADER_RETRY_SECONDS),
+            id="leader_election",
+            name="Take over scheduled jobs when the leader exits",
+            replace_existing=True
+        )
     logging.info("启动后台定时任务调度器...")
     scheduler.start()
 
 def stop_scheduler():
-    """停止调度器"""
+    """停止调度器，并释放调度锁"""
     logging.info("停止后台定时任务调度器...")
     scheduler.shutdown()
-
-# 在模块加载时直接配置好任务
-schedule_pipeline_job()
+    shutdown_pipeline_runner()
+    _leader_lock.release()
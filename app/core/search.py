@@ -0,0 +1,156 @@
+import logging
+import re
+from sqlalchemy import event, text
+
+# 基于 SQLite FTS5 的全文索引，覆盖文章的标题、摘要和技巧。
+# 使用 external content 表（内容仍存储在 articles 表中，索引不重复保存正文），
+# 并通过触发器与 articles 表保持同步，管道写入后无需额外操作。
+# trigram 分词器按三个字符切分，不依赖空格分词，适合中文文本。
+#
+# trigram 索引无法检索少于 3 个字符的词，而中文检索词大多只有两个字（“模型”“推理”）。
+# 因此另有一张二元组索引表：中文连续字符切分为相邻的两字组（外加每段的最后一个字，
+# 使单字检索也能用前缀查询命中），其他文字按词切分。切分由注册在写连接上的 SQL 函数
+# cjk_bigrams() 在触发器中完成，所以必须通过本应用的数据库引擎写入 articles 表
+# （用 sqlite3 命令行直接修改文章会因找不到该函数而失败）。
+
+FTS_TABLE = "articles_fts"
+BIGRAM_TABLE = "articles_bigrams"
+
+# 中日韩文字；与 scripts/content_compactor.py 使用的范围一致
+_CJK_RUN_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+
+_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, summary, skills,
+        content='articles', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, skills)
+        VALUES (new.id, new.title, new.summary, new.skills);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, skills)
+        VALUES ('delete', old.id, old.title, old.summary, old.skills);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE ON articles BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, summary, skills)
+        VALUES ('delete', old.id, old.title, old.summary, old.skills);
+        INSERT INTO {FTS_TABLE}(rowid, title, summary, skills)
+        VALUES (new.id, new.title, new.summary, new.skills);
+    END
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {BIGRAM_TABLE} USING fts5(
+        title, summary, skills,
+        tokenize='unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_bigrams_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO {BIGRAM_TABLE}(rowid, title, summary, skills)
+        VALUES (new.id, cjk_bigrams(new.title), cjk_bigrams(new.summary), cjk_bigrams(new.skills));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_bigrams_ad AFTER DELETE ON articles BEGIN
+        DELETE FROM {BIGRAM_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    # 只在检索的字段变化时重建，更新抓取时间等字段不会触发
+    f"""
+    CREATE TRIGGER IF NOT EXISTS articles_bigrams_au AFTER UPDATE OF title, summary, skills ON articles BEGIN
+        DELETE FROM {BIGRAM_TABLE} WHERE rowid = old.id;
+        INSERT INTO {BIGRAM_TABLE}(rowid, title, summary, skills)
+        VALUES (new.id, cjk_bigrams(new.title), cjk_bigrams(new.summary), cjk_bigrams(new.skills));
+    END
+    """,
+]
+
+# 批量导入数据时可以先删除、之后由 ensure_search_index 重新创建的触发器
+SEARCH_TRIGGERS = [
+    "articles_fts_ai", "articles_fts_ad", "articles_fts_au",
+    "articles_bigrams_ai", "articles_bigrams_ad", "articles_bigrams_au",
+]
+
+
+def _bigrams(run: str) -> list:
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def cjk_bigrams(value):
+    """
+    把文本转换为二元组索引表的内容：每段中文连续字符替换为相邻两字组和最后一个字，其余文字原样保留。
+    例如 “大模型推理” -> “大模 模型 型推 推理 理”。
+    """
+    if value is None:
+        return None
+    return _CJK_RUN_RE.sub(lambda m: " " + " ".join([*_bigrams(m.group()), m.group()[-1]]) + " ", value)
+
+
+def bigram_query(term: str) -> str:
+    """
+    把一个少于 3 个字符的检索词转换为二元组索引表的 FTS5 查询。
+    两个汉字即一个二元组；单个汉字用前缀查询，匹配以它开头的二元组或一段文字的最后一个字；
+    其他文字按整词匹配。
+    """
+    runs = list(_CJK_RUN_RE.finditer(term))
+    tokens = []
+    position = 0
+    for match in runs:
+        tokens.extend(term[position:match.start()].split())
+        run = match.group()
+        tokens.extend(_bigrams(run) if len(run) > 1 else [run])
+        position = match.end()
+    tokens.extend(term[position:].split())
+    phrase = '"' + " ".join(tokens).replace('"', '""') + '"'
+    # 以单个汉字结尾时，最后一个字用前缀匹配
+    if runs and runs[-1].end() == len(term) and len(runs[-1].group()) == 1:
+        return phrase + "*"
+    return phrase
+
+
+def register_search_functions(engine):
+    """在引擎的每个新连接上注册触发器使用的 cjk_bigrams() 函数。"""
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("cjk_bigrams", 1, cjk_bigrams, deterministic=True)
+
+
+def is_search_supported(bind) -> bool:
+    """全文检索依赖 SQLite FTS5，其他数据库暂不支持。"""
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_search_index(bind):
+    """
+    创建全文索引表、二元组索引表和同步触发器。
+    索引表是新建的（例如已有数据库第一次升级）时，用 articles 中的现有数据重建索引。
+    """
+    if not is_search_supported(bind):
+        logging.info("当前数据库不是 SQLite，跳过全文索引的创建。")
+        return
+
+    with bind.begin() as conn:
+        existing = {row[0] for row in conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (:fts, :bigrams)"),
+            {"fts": FTS_TABLE, "bigrams": BIGRAM_TABLE}
+        )}
+        for ddl in _FTS_DDL:
+            conn.execute(text(ddl))
+        if FTS_TABLE not in existing:
+            logging.info("已创建全文索引表，正在用现有文章重建索引...")
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        if BIGRAM_TABLE not in existing:
+            logging.info("已创建二元组索引表，正在用现有文章建立索引...")
+            conn.execute(text(
+                f"INSERT INTO {BIGRAM_TABLE}(rowid, title, summary, skills) "
+                f"SELECT id, cjk_bigrams(title), cjk_bigrams(summary), cjk_bigrams(skills) FROM articles"
+            ))
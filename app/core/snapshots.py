@@ -0,0 +1,212 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.orm import Session
+
+from app.core.config import SNAPSHOT_DIR, SNAPSHOT_PAGES, SNAPSHOT_PAGE_SIZE, DATASET_VERSION_TTL
+from app.core.database import DATABASE_URL
+from app.core.pagination import encode_cursor, decode_cursor
+from app.crud import article as crud_article
+from app.crud.dataset import get_dataset_version
+from app.schemas.article import ArticleOut, ArticlePage
+
+# 时间轴快照：每次数据管道运行结束后，把首页 HTML（内嵌第一页数据）和前 SNAPSHOT_PAGES 页文章 JSON
+# 渲染成静态文件，并预先压缩为 gzip 和 brotli。数据集版本号与快照一致时，
+# 访问首页和前几页直接发送文件，不再经过 Jinja 渲染、ORM 查询和运行时压缩。
+#
+# 目录结构：
+#   SNAPSHOT_DIR/manifest.json            当前快照的清单，原子替换
+#   SNAPSHOT_DIR/v<版本号>-<时间戳>/        一次快照的全部文件（page-N.json、index.html 及 .gz/.br）
+
+MANIFEST_NAME = "manifest.json"
+
+# 压缩格式按优先级排列：(Content-Encoding, 文件后缀)
+_ENCODINGS = [("br", ".br"), ("gzip", ".gz")] if brotli is not None else [("gzip", ".gz")]
+
+
+def render_article_page(db: Session, before: tuple, limit: int):
+    """
+    渲染 /api/articles 的一页响应，接口和快照共用。
+    返回 (JSON 响应体, next_cursor)。
+    """
+    # 多取一条，用来判断是否还有下一页
+    articles = crud_article.get_articles(db, limit=limit + 1, before=before)
+    next_cursor = None
+    if len(articles) > limit:
+        articles = articles[:limit]
+        last = articles[-1]
+        next_cursor = encode_cursor(last.published_date, last.id)
+
+    # 直接由 Pydantic (pydantic-core) 序列化为 JSON 字节，跳过 jsonable_encoder 对 ORM 对象的逐字段转换
+    page = ArticlePage(
+        items=[ArticleOut.model_validate(art) for art in articles],
+        next_cursor=next_cursor
+    )
+    return page.model_dump_json(), next_cursor
+
+
+def _render_index(first_page_json: str) -> str:
+    env = Environment(loader=FileSystemLoader("templates"), autoescape=select_autoescape(["html"]))
+    # 内嵌在 <script> 中的 JSON 不能出现 "</script>"，把 "<" 转义为 JSON 的 <
+    initial_page = first_page_json.replace("<", "\\u003c")
+    return env.get_template("index.html").render(request=None, initial_page=initial_page)
+
+
+def _write_variants(directory: str, name: str, content: bytes):
+    """写入原始文件，以及每种压缩格式的版本（最高压缩级别，只在生成快照时压缩一次）。"""
+    with open(os.path.join(directory, name), "wb") as f:
+        f.write(content)
+    with open(os.path.join(directory, name + ".gz"), "wb") as f:
+        f.write(gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(os.path.join(directory, name + ".br"), "wb") as f:
+            f.write(brotli.compress(content, quality=11))
+
+
+def _read_manifest(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _matches(manifest: dict, version: int) -> bool:
+    """快照是否对应当前数据库的这个数据集版本（版本号相同的另一个数据库，例如基准测试库，不算）。"""
+    return manifest.get("database") == DATABASE_URL and manifest.get("dataset_version") == version
+
+
+def build_snapshots(db: Session, directory: str = SNAPSHOT_DIR) -> bool:
+    """
+    为当前数据集版本生成快照；快照已是最新时直接返回。
+    生成新快照后原子替换清单，并删除更早的快照目录（保留上一份，正在发送的文件不受影响）。
+    返回是否生成了新快照。
+    """
+    if SNAPSHOT_PAGES <= 0:
+        return False
+    version = get_dataset_version(db)
+    current = _read_manifest(directory)
+    if current and _matches(current, version) and current.get("page_size") == SNAPSHOT_PAGE_SIZE:
+        return False
+
+    snapshot_name = f"v{version}-{int(time.time() * 1000)}"
+    snapshot_dir = os.path.join(directory, snapshot_name)
+    os.makedirs(snapshot_dir, exist_ok=True)
+
+    pages = {}
+    first_page = None
+    cursor = None
+    for number in range(SNAPSHOT_PAGES):
+        body, next_cursor = render_article_page(db, decode_cursor(cursor) if cursor else None, SNAPSHOT_PAGE_SIZE)
+        name = f"page-{number}.json"
+        _write_variants(snapshot_dir, name, body.encode("utf-8"))
+        pages[cursor or ""] = name
+        if first_page is None:
+            first_page = body
+        if not next_cursor:
+            break
+        cursor = next_cursor
+    _write_variants(snapshot_dir, "index.html", _render_index(first_page).encode("utf-8"))
+
+    manifest = {
+        "database": DATABASE_URL,
+        "dataset_version": version,
+        "page_size": SNAPSHOT_PAGE_SIZE,
+        "directory": snapshot_name,
+        "pages": pages,
+        "index": "index.html",
+    }
+    temp_path = os.path.join(directory, MANIFEST_NAME + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, os.path.join(directory, MANIFEST_NAME))
+
+    previous = current.get("directory") if current else None
+    for entry in os.listdir(directory):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path) and entry not in (snapshot_name, previous):
+            shutil.rmtree(path, ignore_errors=True)
+    logging.info(f"已生成时间轴快照 {snapshot_name}（{len(pages)} 页）。")
+    return True
+
+
+def choose_encoding(accept_encoding: str, path: str):
+    """
+    根据请求头 Accept-Encoding 选择预压缩的文件，返回 (文件路径, Content-Encoding)。
+    客户端不接受任何压缩格式时返回原始文件，Content-Encoding 为 None。
+    """
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        try:
+            quality = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip())
+    for encoding, suffix in _ENCODINGS:
+        if (encoding in accepted or "*" in accepted) and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+class SnapshotStore:
+    """
+    Web 进程读取快照清单。
+    清单每 DATASET_VERSION_TTL 秒最多检查一次 (stat)，文件变化时才重新加载；
+    只有清单的数据集版本号与当前版本号一致时才使用快照，数据更新后不会返回过期内容。
+    """
+
+    def __init__(self, directory: str = SNAPSHOT_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def _current_manifest(self) -> Optional[dict]:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at >= DATASET_VERSION_TTL:
+                self._checked_at = now
+                try:
+                    mtime = os.stat(os.path.join(self.directory, MANIFEST_NAME)).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime != self._mtime:
+                    self._mtime = mtime
+                    self._manifest = _read_manifest(self.directory) if mtime is not None else None
+            return self._manifest
+
+    def _path(self, manifest: dict, version: int, name: Optional[str]) -> Optional[str]:
+        if not name or not _matches(manifest, version):
+            return None
+        return os.path.join(self.directory, manifest["directory"], name)
+
+    def find_page(self, version: int, cursor: Optional[str], limit: int) -> Optional[str]:
+        """返回与请求对应的文章 JSON 快照路径，没有时返回 None。"""
+        manifest = self._current_manifest()
+        if not manifest or manifest.get("page_size") != limit:
+            return None
+        return self._path(manifest, version, manifest["pages"].get(cursor or ""))
+
+    def find_index(self, version: int) -> Optional[str]:
+        """返回内嵌了第一页数据的首页 HTML 快照路径，没有时返回 None。"""
+        manifest = self._current_manifest()
+        return self._path(manifest, version, manifest.get("index")) if manifest else None
+
+
+timeline_snapshots = SnapshotStore()
@@ -1,6 +1,27 @@
-from sqlalchemy.orm import Session
-from app.models.article import Article
+from sqlalchemy import tuple_, insert, update, delete, exists, text, func, or_, DateTime, Float
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import sqlite, postgresql
+from app.models.article import Article, ArticleSkill
+from app.crud.dataset import bump_dataset_version
+from app.core.search import FTS_TABLE, BIGRAM_TABLE, bigram_query
 from datetime import datetime
+import html
+import json
+import re
+
+# SQLite 对单条语句中绑定参数的数量有上限，批量查询时按此大小分块
+_IN_CLAUSE_CHUNK_SIZE = 500
+
+# trigram 分词器无法用 MATCH 检索少于 3 个字符的词，这类词改用二元组索引（见 app.core.search）
+_TRIGRAM_MIN_LENGTH = 3
+
+# 检索片段中命中词的标记。使用正文中不会出现的控制字符，HTML 转义之后再替换为 <mark>，
+# 文章标题和摘要（抓取及 LLM 生成的文本）中的 HTML 不会被原样输出
+_MARK_START, _MARK_END = "\x02", "\x03"
+# 从摘要截取片段时，命中词之前保留的字符数和片段总长度
+_SNIPPET_CONTEXT = 30
+_SNIPPET_LENGTH = 120
 
 def get_article_by_url(db: Session, url: str):
     """
@@ -9,7 +30,37 @@ def get_article_by_url(db: Session, url: str):
     """
     return db.query(Article).filter(Article.url == url).first()
 
-def create_article(db: Session, title: str, url: str, published_date: datetime, summary: str, skills: str):
+def get_article(db: Session, article_id: int):
+    """通过 id 查询单篇文章。"""
+    return db.get(Article, article_id)
+
+def get_article_fingerprints(db: Session):
+    """
+    逐行返回所有原创文章（不是其他文章的近似重复）的 (id, simhash)，用于构建近似重复检测的索引。
+    文章很多时分批读取，不会一次把所有行加载到内存。
+    """
+    query = (
+        db.query(Article.id, Article.simhash)
+        .filter(Article.simhash.isnot(None), Article.duplicate_of_id.is_(None))
+        .execution_options(yield_per=10000)
+    )
+    for row in query:
+        yield row.id, row.simhash
+
+def get_existing_urls(db: Session, urls) -> set:
+    """
+    批量查询一组候选 URL 中哪些已经存在于数据库中。
+    每 500 个 URL 只需一次 IN 查询，代替逐条调用 get_article_by_url。
+    """
+    candidates = list(dict.fromkeys(urls))
+    existing = set()
+    for start in range(0, len(candidates), _IN_CLAUSE_CHUNK_SIZE):
+        chunk = candidates[start:start + _IN_CLAUSE_CHUNK_SIZE]
+        rows = db.query(Article.url).filter(Article.url.in_(chunk)).all()
+        existing.update(row.url for row in rows)
+    return existing
+
+def create_article(db: Session, title: str, url: str, published_date: datetime, summary: str, skills: list):
     """
     创建并保存一篇新文章。
     """
@@ -18,16 +69,289 @@ def create_article(db: Session, title: str, url: str, published_date: datetime,
         url=url,
         published_date=published_date,
         summary=summary,
-        skills=skills
+        skills=json.dumps(skills, ensure_ascii=False),
+        skill_items=[ArticleSkill(position=i, skill=str(skill)) for i, skill in enumerate(skills)]
     )
     db.add(db_article)
-    db.commit()
+    try:
+        db.flush()
+        bump_dataset_version(db)
+        db.commit()
+    except IntegrityError:
+        # 另一个写入者已经插入了相同 URL 的文章，由唯一约束保证不会重复
+        db.rollback()
+        return get_article_by_url(db, url=url)
     db.refresh(db_article)
     return db_article
 
-def get_articles(db: Session, skip: int = 0, limit: int = 100):
+def _dialect_insert(db: Session):
+    """返回当前数据库方言对应的 insert 构造器，以便使用 ON CONFLICT 子句。"""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+def create_articles_bulk(db: Session, articles: list) -> dict:
     """
-    获取文章列表，支持分页。
-    按发布日期降序排序。
+    在同一个事务中批量写入多篇文章。
+    articles 是包含 title、url、published_date、summary、skills (列表) 键的字典列表，
+    可选的 content_hash、fetched_at、simhash 键记录总结时的正文哈希、抓取时间和 SimHash 指纹；
+    近似重复的文章带有 duplicate_of 键（原文章的 URL），原文章须已存在或在同一批中排在它前面。
+    使用 ON CONFLICT(url) DO NOTHING，由 url 的唯一约束处理并发写入的竞争，已存在的文章会被跳过。
+    有新文章写入时，数据集版本号在同一个事务中递增。
+    返回实际插入的文章 {url: id}。
+    """
+    if not articles:
+        return {}
+    rows = [
+        {
+            "title": a["title"],
+            "url": a["url"],
+            "published_date": a["published_date"],
+            "summary": a["summary"],
+            "skills": json.dumps(a["skills"], ensure_ascii=False),
+            "content_hash": a.get("content_hash"),
+            "fetched_at": a.get("fetched_at"),
+            "simhash": a.get("simhash"),
+        }
+        for a in articles
+    ]
+    stmt = (
+        _dialect_insert(db)(Article)
+        .on_conflict_do_nothing(index_elements=[Article.url])
+        .returning(Article.id, Article.url)
+    )
+    try:
+        inserted = {row.url: row.id for row in db.execute(stmt, rows)}
+        skill_rows = [
+            {"article_id": inserted[a["url"]], "position": i, "skill": str(skill)}
+            for a in articles if a["url"] in inserted
+            for i, skill in enumerate(a["skills"])
+        ]
+        if skill_rows:
+            db.execute(insert(ArticleSkill), skill_rows)
+        _link_duplicates(db, [a for a in articles if a.get("duplicate_of") and a["url"] in inserted], inserted)
+        if inserted:
+            bump_dataset_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return inserted
+
+def _link_duplicates(db: Session, duplicates: list, inserted: dict):
+    """把刚插入的近似重复文章指向原文章；原文章在同一批中插入时直接使用返回的 id。"""
+    if not duplicates:
+        return
+    original_ids = dict(inserted)
+    missing = [a["duplicate_of"] for a in duplicates if a["duplicate_of"] not in original_ids]
+    for start in range(0, len(missing), _IN_CLAUSE_CHUNK_SIZE):
+        chunk = missing[start:start + _IN_CLAUSE_CHUNK_SIZE]
+        original_ids.update((row.url, row.id) for row in db.query(Article.id, Article.url).filter(Article.url.in_(chunk)))
+    links = [
+        {"id": inserted[a["url"]], "duplicate_of_id": original_ids[a["duplicate_of"]]}
+        for a in duplicates if a["duplicate_of"] in original_ids
+    ]
+    if links:
+        db.execute(update(Article), links)
+
+def get_articles_due_for_refresh(db: Session, urls, fetched_before: datetime) -> list:
+    """
+    在一组 URL 中找出需要刷新的已有文章：从未记录过抓取时间，或上次抓取早于 fetched_before。
+    返回包含 id、url、content_hash 的行。
+    """
+    candidates = list(dict.fromkeys(urls))
+    due = []
+    for start in range(0, len(candidates), _IN_CLAUSE_CHUNK_SIZE):
+        chunk = candidates[start:start + _IN_CLAUSE_CHUNK_SIZE]
+        due.extend(
+            db.query(Article.id, Article.url, Article.content_hash)
+            .filter(Article.url.in_(chunk))
+            .filter(or_(Article.fetched_at.is_(None), Article.fetched_at < fetched_before))
+            .all()
+        )
+    return due
+
+def mark_articles_fetched(db: Session, fingerprints: dict, fetched_at: datetime):
+    """
+    记录正文未变化（或首次记录哈希）的文章的抓取时间、正文哈希和 SimHash 指纹。
+    fingerprints 为 {文章 id: (正文哈希, simhash)}。接口返回的字段没有变化，因此不递增数据集版本号。
+    """
+    if not fingerprints:
+        return
+    db.execute(
+        update(Article),
+        [{"id": article_id, "content_hash": content_hash, "simhash": simhash, "fetched_at": fetched_at}
+         for article_id, (content_hash, simhash) in fingerprints.items()],
+    )
+    db.commit()
+
+def update_articles_content(db: Session, updates: list) -> int:
     """
-    return db.query(Article).order_by(Article.published_date.desc()).offset(skip).limit(limit).all()
+    在同一个事务中用重新总结的结果更新已有文章。
+    updates 是包含 id、title、published_date、summary、skills (列表)、content_hash、simhash、fetched_at 键的字典列表。
+    article_skills 表中的技巧整体替换，数据集版本号在同一个事务中递增。
+    返回更新的文章数量。
+    """
+    if not updates:
+        return 0
+    try:
+        db.execute(
+            update(Article),
+            [
+                {
+                    "id": u["id"],
+                    "title": u["title"],
+                    "published_date": u["published_date"],
+                    "summary": u["summary"],
+                    "skills": json.dumps(u["skills"], ensure_ascii=False),
+                    "content_hash": u["content_hash"],
+                    "simhash": u["simhash"],
+                    "fetched_at": u["fetched_at"],
+                }
+                for u in updates
+            ],
+        )
+        db.execute(delete(ArticleSkill).where(ArticleSkill.article_id.in_([u["id"] for u in updates])))
+        skill_rows = [
+            {"article_id": u["id"], "position": i, "skill": str(skill)}
+            for u in updates
+            for i, skill in enumerate(u["skills"])
+        ]
+        if skill_rows:
+            db.execute(insert(ArticleSkill), skill_rows)
+        bump_dataset_version(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(updates)
+
+def get_articles(db: Session, limit: int = 100, before: tuple = None):
+    """
+    获取文章列表，按 (发布日期, id) 降序排序，使用游标（keyset）分页。
+    before 为上一页最后一篇文章的 (published_date, id)，只返回排在它之后的文章；
+    借助复合索引直接定位，翻到多深的页面开销都一样。
+    近似重复的文章（转载等）不在时间轴中重复显示。
+    """
+    query = (
+        db.query(Article).options(selectinload(Article.skill_items))
+        .filter(Article.duplicate_of_id.is_(None))
+    )
+    if before is not None:
+        query = query.filter(tuple_(Article.published_date, Article.id) < tuple_(*before))
+    return query.order_by(Article.published_date.desc(), Article.id.desc()).limit(limit).all()
+
+def get_articles_after_id(db: Session, after_id: int, limit: int = 100):
+    """
+    获取 id 大于 after_id 的文章，按 id 升序（即写入顺序）排列。
+    用于向 /api/stream 的订阅者推送新写入的文章；近似重复的文章不推送。
+    """
+    return (
+        db.query(Article).options(selectinload(Article.skill_items))
+        .filter(Article.id > after_id, Article.duplicate_of_id.is_(None))
+        .order_by(Article.id)
+        .limit(limit)
+        .all()
+    )
+
+def get_max_article_id(db: Session) -> int:
+    """返回当前最大的文章 id，没有文章时为 0。"""
+    return db.query(func.max(Article.id)).scalar() or 0
+
+def backfill_article_skills(db: Session) -> int:
+    """
+    为还没有 article_skills 记录的旧文章，从 skills JSON 字段补齐技巧表。
+    返回补齐的文章数量。
+    """
+    rows = (
+        db.query(Article.id, Article.skills)
+        .filter(Article.skills.isnot(None))
+        .filter(~exists().where(ArticleSkill.article_id == Article.id))
+        .all()
+    )
+    skill_rows = []
+    for article_id, skills_json in rows:
+        try:
+            skills = json.loads(skills_json)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(skills, list):
+            continue
+        skill_rows.extend(
+            {"article_id": article_id, "position": i, "skill": str(skill)}
+            for i, skill in enumerate(skills)
+        )
+    if skill_rows:
+        db.execute(insert(ArticleSkill), skill_rows)
+        db.commit()
+    return len({row["article_id"] for row in skill_rows})
+
+def _render_snippet(raw: str) -> str:
+    """把带有 _MARK_START/_MARK_END 标记的原始文本转换为 HTML：先转义全部文本，再把标记换成 <mark>。"""
+    return html.escape(raw).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+def _summary_snippet(summary: str, terms: list) -> str:
+    """从摘要中截取第一个命中词附近的片段，并标出其中所有命中的词。"""
+    if not summary:
+        return summary
+    pattern = re.compile("|".join(re.escape(t) for t in terms), re.IGNORECASE)
+    first = pattern.search(summary)
+    begin = max(0, first.start() - _SNIPPET_CONTEXT) if first else 0
+    window = summary[begin:begin + _SNIPPET_LENGTH]
+    marked = pattern.sub(lambda m: f"{_MARK_START}{m.group()}{_MARK_END}", window)
+    prefix = "…" if begin > 0 else ""
+    suffix = "…" if begin + _SNIPPET_LENGTH < len(summary) else ""
+    return _render_snippet(prefix + marked + suffix)
+
+def search_articles(db: Session, query: str, limit: int = 20) -> list:
+    """
+    在标题、摘要和技巧中全文检索文章，按相关度 (bm25，标题权重最高) 排序；近似重复的文章不会出现在结果中。
+    以空白分隔的多个词之间是 AND 关系。3 个字符及以上的词使用 trigram 索引，
+    更短的词（例如两个字的中文词）使用二元组索引，两种情况都不会全表扫描；短的非中文词按整词匹配。
+    返回包含 id、title、url、published_date、snippet、score 的字典；
+    snippet 是 HTML 转义后的片段，命中的词用 <mark> 标出，可以直接插入页面。
+    """
+    terms = query.split()
+    if not terms:
+        return []
+
+    match_terms = [t for t in terms if len(t) >= _TRIGRAM_MIN_LENGTH]
+    short_terms = [t for t in terms if len(t) < _TRIGRAM_MIN_LENGTH]
+
+    # 每个词都作为短语加引号，用户输入中的 FTS5 语法字符不会被解释
+    params = {"limit": limit}
+    if short_terms:
+        params["short"] = " ".join(bigram_query(t) for t in short_terms)
+
+    if match_terms:
+        params["match"] = " ".join('"' + t.replace('"', '""') + '"' for t in match_terms)
+        conditions = [f"{FTS_TABLE} MATCH :match"]
+        if short_terms:
+            conditions.append(f"a.id IN (SELECT rowid FROM {BIGRAM_TABLE} WHERE {BIGRAM_TABLE} MATCH :short)")
+        index_table = FTS_TABLE
+        snippet = f"snippet({FTS_TABLE}, -1, '{_MARK_START}', '{_MARK_END}', '…', 32)"
+    else:
+        conditions = [f"{BIGRAM_TABLE} MATCH :short"]
+        index_table = BIGRAM_TABLE
+        # 二元组索引中存的是切分后的文本，片段从原始摘要中截取
+        snippet = "a.summary"
+
+    sql = text(f"""
+        SELECT a.id, a.title, a.url, a.published_date, {snippet} AS snippet,
+               bm25({index_table}, 10.0, 5.0, 2.0) AS score
+        FROM {index_table}
+        JOIN articles AS a ON a.id = {index_table}.rowid
+        WHERE {" AND ".join(conditions)} AND a.duplicate_of_id IS NULL
+        ORDER BY score
+        LIMIT :limit
+    """).columns(published_date=DateTime, score=Float)
+
+    hits = []
+    for row in db.execute(sql, params).mappings():
+        hit = dict(row)
+        if match_terms:
+            hit["snippet"] = _render_snippet(hit["snippet"]) if hit["snippet"] is not None else None
+        else:
+            hit["snippet"] = _summary_snippet(hit["snippet"], short_terms)
+        hits.append(hit)
+    return hits
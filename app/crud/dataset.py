@@ -0,0 +1,27 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models.dataset import DatasetVersion
+
+# 版本表中唯一一行的主键
+_ROW_ID = 1
+
+def get_dataset_version(db: Session) -> int:
+    """
+    读取当前数据集版本号，尚未写入过数据时为 0。
+    """
+    version = db.query(DatasetVersion.version).filter(DatasetVersion.id == _ROW_ID).scalar()
+    return version or 0
+
+def bump_dataset_version(db: Session):
+    """
+    将数据集版本号加一。
+    不会自行提交，应与写入文章的操作放在同一个事务中，保证版本号与数据一起可见。
+    """
+    result = db.execute(
+        update(DatasetVersion)
+        .where(DatasetVersion.id == _ROW_ID)
+        .values(version=DatasetVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.add(DatasetVersion(id=_ROW_ID, version=1))
+        db.flush()
@@ -0,0 +1,80 @@
+import json
+import logging
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models.summary_cache import SummaryCache
+
+def get_cached_summary(db: Session, cache_key: str):
+    """
+    查询缓存的总结结果，命中时返回 {"summary", "skills"} 并累加命中次数，未命中返回 None。
+    命中次数只是统计信息，更新失败时仍然返回命中的结果。
+    """
+    entry = db.get(SummaryCache, cache_key)
+    if entry is None:
+        return None
+    result = {"summary": entry.summary, "skills": json.loads(entry.skills)}
+    # 先结束读事务，再用一条 UPDATE 在单独的短事务中累加。WAL 模式下同一事务先读后写时，
+    # 若期间有其他连接提交，升级写锁会报 SQLITE_BUSY_SNAPSHOT，busy_timeout 不会重试
+    db.rollback()
+    try:
+        db.execute(
+            update(SummaryCache)
+            .where(SummaryCache.cache_key == cache_key)
+            .values(hit_count=SummaryCache.hit_count + 1, last_hit_at=func.now())
+        )
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logging.warning(f"更新总结缓存命中次数失败: {e}")
+    return result
+
+def save_cached_summary(db: Session, cache_key: str, prompt_version: str, provider: str, model_id: str, result: dict):
+    """
+    保存一条总结结果。相同的键已存在时（例如并发总结了同一内容）保留已有记录。
+    """
+    db.add(SummaryCache(
+        cache_key=cache_key,
+        prompt_version=prompt_version,
+        provider=provider,
+        model_id=model_id,
+        summary=result["summary"],
+        skills=json.dumps(result["skills"], ensure_ascii=False),
+        hit_count=0
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+def invalidate_summaries(db: Session, keep_prompt_version: str = None) -> int:
+    """
+    删除缓存条目。指定 keep_prompt_version 时只删除其他提示词版本生成的结果，否则清空全部。
+    返回删除的条目数。
+    """
+    query = db.query(SummaryCache)
+    if keep_prompt_version is not None:
+        query = query.filter(SummaryCache.prompt_version != keep_prompt_version)
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def get_summary_cache_stats(db: Session):
+    """
+    按提示词版本、提供方和模型汇总缓存条目数和累计命中次数。
+    """
+    rows = (
+        db.query(
+            SummaryCache.prompt_version,
+            SummaryCache.provider,
+            SummaryCache.model_id,
+            func.count(SummaryCache.cache_key),
+            func.coalesce(func.sum(SummaryCache.hit_count), 0),
+        )
+        .group_by(SummaryCache.prompt_version, SummaryCache.provider, SummaryCache.model_id)
+        .all()
+    )
+    return [
+        {"prompt_version": v, "provider": p, "model_id": m, "entries": n, "hits": hits}
+        for v, p, m, n, hits in rows
+    ]
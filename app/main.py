@@ -1,29 +1,40 @@
-from fastapi import FastAPI, Depends, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Depends, Request, Query, Header, HTTPException
+from fastapi.responses import HTMLResponse, JSONResponse, Response, PlainTextResponse, StreamingResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-import uvicorn
-import json
+import asyncio
+import hmac
+import time
 from contextlib import asynccontextmanager
 
 # 导入数据库、模型和 CRUD 操作
-from app.core.database import engine, Base, get_db
-from app.models import article
+from app.core.database import init_db, get_db
 from app.crud import article as crud_article
+from app.core.pagination import decode_cursor
+from app.schemas.article import ArticlePage, SearchHit, SearchResults
+from app.core.search import is_search_supported
+from app.core.cache import article_page_cache, current_dataset_version, make_etag, etag_matches
+from app.core.config import API_CACHE_MAX_AGE, STREAM_KEEPALIVE_SECONDS, PIPELINE_ADMIN_TOKEN
+from app.core.events import article_broker, load_articles_after, END_OF_STREAM
+from app.core.snapshots import timeline_snapshots, render_article_page, choose_encoding
+from app.core.metrics import REGISTRY, HTTP_REQUEST_SECONDS
 # 导入调度器控制函数
-from app.core.scheduler import start_scheduler, stop_scheduler
+from app.core.scheduler import start_scheduler, stop_scheduler, is_scheduler_leader
+from app.core.pipeline_runner import trigger_pipeline_run, get_pipeline_status
 
-# 在应用启动时创建数据库表
-Base.metadata.create_all(bind=engine)
-
-# 使用 lifespan 事件处理器来管理后台任务
+# 使用 lifespan 事件处理器来管理后台任务。
+# 导入本模块不产生任何副作用（不建表、不连接 AI 服务、不注册定时任务），
+# 这些工作都推迟到服务真正启动时，AI 客户端和管道模块则只在管道子进程中加载。
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 应用启动时执行
+    # 应用启动时执行：创建数据库表和索引，然后启动调度器
+    init_db()
     start_scheduler()
+    article_broker.start()
     yield
     # 应用关闭时执行
+    await article_broker.stop()
     stop_scheduler()
 
 app = FastAPI(
@@ -33,39 +44,197 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """按路由模板（而不是实际路径）统计请求耗时，避免路径参数造成标签爆炸。"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        )
+
 # 挂载 static 文件夹，用于提供 CSS 和 JS 文件
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # 设置 Jinja2 模板
 templates = Jinja2Templates(directory="templates")
 
+# 同一 URL 可能返回预压缩的快照，所有响应（包括 304）都声明按 Accept-Encoding 区分，
+# 共享缓存不会把压缩过的响应体发给不接受该编码的客户端
+_VARY_HEADERS = {"Vary": "Accept-Encoding"}
+
+def _snapshot_response(path: str, encoding: str, media_type: str, headers: dict) -> FileResponse:
+    """直接发送 choose_encoding() 选出的快照文件。"""
+    if encoding:
+        headers = {**headers, "Content-Encoding": encoding}
+    return FileResponse(path, media_type=media_type, headers=headers)
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     """
     提供前端主页面 index.html。
+    有最新的快照时直接发送预渲染、预压缩、内嵌了第一页数据的页面。
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    version = await asyncio.to_thread(current_dataset_version)
+    snapshot = timeline_snapshots.find_index(version)
+    if snapshot:
+        path, encoding = choose_encoding(request.headers.get("accept-encoding"), snapshot)
+        headers = {**_VARY_HEADERS, "ETag": make_etag(version, "index", encoding=encoding), "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return _snapshot_response(path, encoding, "text/html; charset=utf-8", headers)
+    return templates.TemplateResponse(request, "index.html", headers=_VARY_HEADERS)
 
-@app.get("/api/articles")
-def get_all_articles(db: Session = Depends(get_db), skip: int = 0, limit: int = 10):
+@app.get("/api/articles", response_model=ArticlePage)
+def get_all_articles(
+    request: Request,
+    db: Session = Depends(get_db),
+    cursor: str = None,
+    limit: int = Query(10, ge=1, le=100),
+):
     """
     API 端点，用于分页获取所有已处理并存储在数据库中的文章。
-    - skip: 跳过的记录数
+    - cursor: 上一页响应中的 next_cursor，首页不传
     - limit: 每页返回的记录数
+    返回 {"items": [...], "next_cursor": ...}，next_cursor 为 null 表示没有更多文章。
+    响应按数据集版本号缓存，并带有 ETag，客户端重复请求时返回 304。
+    """
+    before = None
+    if cursor:
+        try:
+            before = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    version = current_dataset_version()
+    # 前几页有预渲染的快照时直接发送文件，ETag 随选中的编码变化
+    snapshot = timeline_snapshots.find_page(version, cursor, limit)
+    path, encoding = None, None
+    if snapshot:
+        path, encoding = choose_encoding(request.headers.get("accept-encoding"), snapshot)
+    etag = make_etag(version, cursor, limit, encoding=encoding)
+    headers = {**_VARY_HEADERS, "ETag": etag, "Cache-Control": f"public, max-age={API_CACHE_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if snapshot:
+        return _snapshot_response(path, encoding, "application/json", headers)
+
+    cache_key = (version, cursor, limit)
+    body = article_page_cache.get(cache_key)
+    if body is None:
+        body, _ = render_article_page(db, before, limit)
+        article_page_cache.set(cache_key, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/search", response_model=SearchResults)
+def search(
+    db: Session = Depends(get_db),
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    全文检索文章的标题、摘要和技巧。
+    - q: 检索词，多个词用空格分隔，需同时命中
+    - limit: 返回的最大结果数
+    """
+    if not is_search_supported(db.get_bind()):
+        raise HTTPException(status_code=501, detail="Full-text search requires SQLite FTS5")
+    rows = crud_article.search_articles(db, q, limit=limit)
+    results = SearchResults(query=q, items=[SearchHit.model_validate(dict(row)) for row in rows])
+    return Response(content=results.model_dump_json(), media_type="application/json")
+
+@app.get("/api/stream")
+async def stream_articles(request: Request):
+    """
+    以 Server-Sent Events 推送新写入的文章（事件名 article，data 与 /api/articles 中的单篇文章相同）。
+    浏览器断线重连时会带上 Last-Event-ID，期间错过的文章会先补发。
+    """
+    try:
+        last_event_id = int(request.headers.get("last-event-id", ""))
+    except ValueError:
+        last_event_id = None
+
+    # 先订阅再补发，补发期间写入的文章不会丢失；重复的由 id 去重
+    queue = article_broker.subscribe()
+    missed = await asyncio.to_thread(load_articles_after, last_event_id) if last_event_id is not None else []
+
+    async def event_source():
+        sent_id = last_event_id or 0
+        try:
+            yield "retry: 5000\n\n"
+            for article_id, event in missed:
+                sent_id = article_id
+                yield event
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if item is END_OF_STREAM:
+                    break
+                article_id, event = item
+                if article_id > sent_id:
+                    sent_id = article_id
+                    yield event
+        finally:
+            article_broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        # 禁止缓存和 Nginx 的响应缓冲，事件才能立即到达浏览器
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def require_pipeline_admin(authorization: str = Header(None)):
+    """
+    校验手动触发数据管道的令牌。未配置 PIPELINE_ADMIN_TOKEN 时一律拒绝。
+    """
+    if not PIPELINE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="未配置 PIPELINE_ADMIN_TOKEN，手动触发已禁用")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), PIPELINE_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="令牌无效", headers={"WWW-Authenticate": "Bearer"})
+
+@app.post("/api/pipeline/run", dependencies=[Depends(require_pipeline_admin)])
+async def run_pipeline():
+    """
+    手动触发一次数据管道运行。管道在独立的子进程中执行，本接口立即返回。
+    每次运行都会调用付费的 LLM 接口，需要携带 PIPELINE_ADMIN_TOKEN。
+    """
+    started = trigger_pipeline_run(trigger="manual")
+    return JSONResponse(
+        status_code=202 if started else 409,
+        content={"started": started, "status": get_pipeline_status()}
+    )
+
+@app.get("/api/pipeline/status")
+async def pipeline_status():
+    """
+    查询本进程最近一次触发的数据管道运行状态。
+    多 worker 部署时，scheduler_leader 表示该进程是否负责执行定时任务。
+    """
+    return {**get_pipeline_status(), "scheduler_leader": is_scheduler_leader()}
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    以 Prometheus 文本格式输出指标：接口耗时、SQL 耗时，
+    以及各次数据管道运行的分阶段耗时、LLM 延迟和 token 用量。
     """
-    articles = crud_article.get_articles(db, skip=skip, limit=limit)
-    
-    # 将 skills 字符串解析回 JSON 列表
-    for art in articles:
-        if art.skills:
-            try:
-                art.skills = json.loads(art.skills)
-            except json.JSONDecodeError:
-                art.skills = [] # 如果解析失败，提供一个空列表
-        else:
-            art.skills = [] # 确保前端总能收到一个列表
-            
-    return articles
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/api/health")
 async def health_check():
@@ -75,4 +244,5 @@ async def health_check():
     return {"status": "ok"}
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
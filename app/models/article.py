@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Index, ForeignKey
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -7,6 +8,10 @@ class Article(Base):
     文章数据模型 (ORM Model)
     """
     __tablename__ = "articles"
+    __table_args__ = (
+        # 时间轴按 (published_date, id) 降序做游标分页，该复合索引让任意深度的翻页都只需一次索引定位
+        Index("ix_articles_published_date_id", "published_date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     
@@ -19,10 +24,48 @@ class Article(Base):
     
     summary = Column(Text, nullable=True, comment="AI 生成的内容摘要")
     
+    # JSON 格式的原始副本；接口读取的是 article_skills 表，无需每次请求都解析 JSON
     skills = Column(Text, nullable=True, comment="AI 提炼的技巧/能力点列表 (JSON 格式存储)")
     
+    # 规范化正文的 SHA-256；刷新模式只在它变化时才重新调用 AI 总结
+    content_hash = Column(String(64), nullable=True, comment="规范化正文的哈希")
+
+    fetched_at = Column(DateTime, nullable=True, comment="最近一次抓取正文的时间")
+
+    # 规范化正文的 64 位 SimHash 指纹（按有符号整数存储），用于检测转载等近似重复的文章
+    simhash = Column(BigInteger, nullable=True, comment="正文的 SimHash 指纹")
+
+    # 近似重复的文章指向最早收录的那一篇，复用它的摘要，不在时间轴中重复显示
+    duplicate_of_id = Column(Integer, ForeignKey("articles.id", ondelete="SET NULL"), nullable=True,
+                             comment="近似重复时指向原文章")
+
     # default=func.now() 会在创建记录时自动设置为当前时间
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="记录创建时间")
 
+    skill_items = relationship(
+        "ArticleSkill",
+        order_by="ArticleSkill.position",
+        cascade="all, delete-orphan",
+    )
+
+    @property
+    def skill_names(self):
+        """按顺序返回技巧文本列表，可直接用于接口响应。"""
+        return [item.skill for item in self.skill_items]
+
     def __repr__(self):
         return f"<Article(title='{self.title}', url='{self.url}')>"
+
+class ArticleSkill(Base):
+    """
+    文章的技巧/能力点，每条技巧一行 (ORM Model)
+    """
+    __tablename__ = "article_skills"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    article_id = Column(Integer, ForeignKey("articles.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    position = Column(Integer, nullable=False, comment="技巧在列表中的顺序")
+
+    skill = Column(Text, nullable=False, comment="技巧/能力点内容")
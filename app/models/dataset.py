@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class DatasetVersion(Base):
+    """
+    文章数据集的版本号 (ORM Model)
+    表中只有一行，每次有新文章提交时版本号加一，用于让接口缓存失效。
+    """
+    __tablename__ = "dataset_version"
+
+    id = Column(Integer, primary_key=True)
+
+    version = Column(Integer, nullable=False, default=0, comment="数据集版本号")
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), comment="最近一次更新时间")
+
+    def __repr__(self):
+        return f"<DatasetVersion(version={self.version})>"
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class SummaryCache(Base):
+    """
+    AI 总结结果缓存 (ORM Model)
+    以 (规范化后的正文, 标题, 提示词版本, 提供方, 模型) 的哈希为键，
+    相同输入再次总结时直接返回结果，不再调用付费的 LLM 接口。
+    """
+    __tablename__ = "summary_cache"
+
+    cache_key = Column(String(64), primary_key=True, comment="输入内容的 SHA-256 哈希")
+
+    prompt_version = Column(String(32), nullable=False, index=True, comment="生成该结果时的提示词版本")
+
+    provider = Column(String(32), nullable=False, comment="AI 提供方")
+
+    model_id = Column(String(128), nullable=False, comment="模型 ID")
+
+    summary = Column(Text, nullable=False, comment="AI 生成的内容摘要")
+
+    skills = Column(Text, nullable=False, comment="AI 提炼的技巧列表 (JSON 格式存储)")
+
+    hit_count = Column(Integer, nullable=False, default=0, comment="命中次数")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="记录创建时间")
+
+    last_hit_at = Column(DateTime(timezone=True), nullable=True, comment="最近一次命中时间")
+
+    def __repr__(self):
+        return f"<SummaryCache(key='{self.cache_key[:12]}', prompt_version='{self.prompt_version}')>"
@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ArticleOut(BaseModel):
+    """
+    时间轴接口返回的单篇文章。
+    skills 从 Article.skill_names 读取，即 article_skills 表中按顺序排列的技巧。
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    url: str
+    published_date: datetime
+    summary: Optional[str] = None
+    skills: List[str] = Field(default_factory=list, validation_alias="skill_names")
+    created_at: Optional[datetime] = None
+
+
+class ArticlePage(BaseModel):
+    """
+    /api/articles 的分页响应。next_cursor 为 None 表示没有更多文章。
+    """
+    items: List[ArticleOut]
+    next_cursor: Optional[str] = None
+
+
+class SearchHit(BaseModel):
+    """
+    全文检索结果中的一篇文章。snippet 为 HTML 转义后的命中片段，命中的词用 <mark> 标出，可以直接插入页面。
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    url: str
+    published_date: datetime
+    snippet: Optional[str] = None
+    score: float
+
+
+class SearchResults(BaseModel):
+    """
+    /api/search 的响应，items 按相关度排序。
+    """
+    query: str
+    items: List[SearchHit]
@@ -0,0 +1,149 @@
+"""
+Throughput and latency benchmark for /api/articles at different page depths.
+
+Starts uvicorn on a synthetic database (generated first if it doesn't exist),
+then for every depth sends --requests requests with --concurrency clients for
+the page that starts after that many articles, and reports requests/s and
+p50/p99 latency.
+
+    python benchmarks/api_bench.py --rows 1000000 --depths 0,1000,100000,999000
+    python benchmarks/api_bench.py --no-cache --save
+
+By default the in-process response cache stays on, as in production; with
+--no-cache every request goes to the database. Clients never send
+If-None-Match, so 304 responses are not measured.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import httpx
+
+from benchmarks.results import save_results, percentile
+
+
+def _ensure_database(db_path: str, rows: int):
+    if not os.path.exists(db_path):
+        subprocess.run([sys.executable, os.path.join(os.path.dirname(__file__), 'synthetic_db.py'),
+                        '--rows', str(rows), '--out', db_path], check=True)
+
+
+def _cursor_at_depth(db_path: str, depth: int):
+    """Cursor of the page that starts after `depth` articles in timeline order (None for the first page)."""
+    if depth <= 0:
+        return None
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.core.pagination import encode_cursor
+    from app.models.article import Article
+
+    engine = create_engine(f"sqlite:///{os.path.abspath(db_path)}")
+    try:
+        with Session(engine) as session:
+            row = (session.query(Article.published_date, Article.id)
+                   .order_by(Article.published_date.desc(), Article.id.desc())
+                   .offset(depth - 1).limit(1).first())
+    finally:
+        engine.dispose()
+    return encode_cursor(row.published_date, row.id) if row else None
+
+
+def _start_server(db_path: str, port: int, no_cache: bool) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.abspath(db_path)}")
+    if no_cache:
+        env['API_CACHE_MAX_ENTRIES'] = '0'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit("The API server did not start within 60s.")
+
+
+async def _load(url: str, params: dict, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client_loop(client: httpx.AsyncClient):
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.get(url, params=params)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await client.get(url, params=params)  # warm-up
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'requests_per_s': requests / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'errors': errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/articles on a synthetic database.")
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(__file__), 'data', 'aiview-bench.db'))
+    parser.add_argument('--rows', type=int, default=100_000, help="Rows to generate when --db doesn't exist.")
+    parser.add_argument('--depths', default='0,1000,10000,99000',
+                        help="Comma-separated numbers of articles before the requested page.")
+    parser.add_argument('--limit', type=int, default=10, help="Page size.")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per depth.")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--no-cache', action='store_true', help="Disable the in-process response cache.")
+    parser.add_argument('--save', action='store_true', help="Save the results for later comparison.")
+    args = parser.parse_args()
+
+    _ensure_database(args.db, args.rows)
+    depths = [int(d) for d in args.depths.split(',')]
+    cursors = {depth: _cursor_at_depth(args.db, depth) for depth in depths}
+
+    server = _start_server(args.db, args.port, args.no_cache)
+    metrics = {}
+    try:
+        url = f"http://127.0.0.1:{args.port}/api/articles"
+        print(f"{'depth':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for depth in depths:
+            params = {'limit': args.limit}
+            if cursors[depth]:
+                params['cursor'] = cursors[depth]
+            stats = asyncio.run(_load(url, params, args.requests, args.concurrency))
+            print(f"{depth:>10}{stats['requests_per_s']:>10.0f}{stats['p50_ms']:>10.2f}"
+                  f"{stats['p99_ms']:>10.2f}{stats['errors']:>8}")
+            for name, value in stats.items():
+                metrics[f"articles.depth_{depth}.{name}"] = value
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    if args.save:
+        params = {key: value for key, value in vars(args).items() if key not in ('save', 'port')}
+        params['db'] = os.path.basename(args.db)
+        save_results('api', params, metrics)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares two benchmark result files, e.g. from before and after a change.
+
+    python benchmarks/compare.py results/api-1a2b3c4-....json results/api-5d6e7f8-....json
+    python benchmarks/compare.py OLD NEW --threshold 5 --fail-on-regression
+
+Metrics that got worse by more than --threshold percent are flagged.
+"""
+import argparse
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.results import load_results
+
+
+def higher_is_better(name: str) -> bool:
+    return name.endswith('_per_s') or name.endswith('_ratio')
+
+
+def compare(old: dict, new: dict, threshold: float) -> list:
+    """Returns rows of (metric, old, new, change %, regressed) for metrics present in both files."""
+    rows = []
+    for name in sorted(set(old['metrics']) & set(new['metrics'])):
+        before, after = old['metrics'][name], new['metrics'][name]
+        if not isinstance(before, (int, float)) or not isinstance(after, (int, float)):
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if higher_is_better(name) else change
+        rows.append((name, before, after, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Percent change that counts as a regression (default 10).")
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help="Exit with status 1 when any metric regressed.")
+    args = parser.parse_args()
+
+    old, new = load_results(args.old), load_results(args.new)
+    if old['benchmark'] != new['benchmark']:
+        sys.exit(f"Cannot compare '{old['benchmark']}' with '{new['benchmark']}' results.")
+    if old['params'] != new['params']:
+        print("Warning: the two runs used different parameters:", file=sys.stderr)
+        for key in sorted(set(old['params']) | set(new['params'])):
+            if old['params'].get(key) != new['params'].get(key):
+                print(f"  {key}: {old['params'].get(key)} -> {new['params'].get(key)}", file=sys.stderr)
+
+    old_env, new_env = old['environment'], new['environment']
+    print(f"{old['benchmark']}: {old_env['commit']} ({old_env['timestamp']}) -> "
+          f"{new_env['commit']} ({new_env['timestamp']})")
+    rows = compare(old, new, args.threshold)
+    width = max((len(row[0]) for row in rows), default=10) + 2
+    print(f"{'metric':<{width}}{'old':>12}{'new':>12}{'change':>10}")
+    for name, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{name:<{width}}{before:>12.2f}{after:>12.2f}{change:>+9.1f}%{flag}")
+
+    if args.fail_on_regression and any(row[4] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
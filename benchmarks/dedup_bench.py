@@ -0,0 +1,130 @@
+"""
+Benchmark of near-duplicate detection (scripts/near_duplicates.py).
+
+Fingerprints the fixture article, then fills a SimHashIndex with --articles
+random fingerprints and times lookups: near-duplicates (a copy of an indexed
+fingerprint with up to DUPLICATE_MAX_DISTANCE bits flipped, which must be found)
+and unrelated fingerprints (which must not be). Also reports the memory the
+index takes.
+
+    python benchmarks/dedup_bench.py
+    python benchmarks/dedup_bench.py --articles 1000000 --lookups 20000 --budget-ms 1 --save
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.results import save_results
+from scripts import near_duplicates
+from scripts import scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def fingerprint_fixture(iterations: int) -> float:
+    """Returns the mean time (ms) to fingerprint the fixture article."""
+    with open(os.path.join(FIXTURES_DIR, 'article.html'), 'rb') as f:
+        content = scraper.parse_article_content(f.read(), encoding='utf-8')['content']
+    near_duplicates.simhash(content)  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        near_duplicates.simhash(content)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def flip_bits(fingerprint: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(near_duplicates.FINGERPRINT_BITS), count):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def build_index(fingerprints: list):
+    index = near_duplicates.SimHashIndex()
+    for article_id, fingerprint in enumerate(fingerprints, 1):
+        index.add(article_id, fingerprint)
+    return index
+
+
+def time_lookups(index, queries: list) -> tuple:
+    """Returns (per-lookup times in ms, number of queries that found a match)."""
+    times, found = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        match = index.find(query)
+        times.append((time.perf_counter() - start) * 1000)
+        found += match is not None
+    return times, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate fingerprinting and lookups.")
+    parser.add_argument('--articles', type=int, default=100000, help="Fingerprints in the index.")
+    parser.add_argument('--lookups', type=int, default=10000, help="Lookups per kind.")
+    parser.add_argument('--iterations', type=int, default=20, help="Fingerprint runs over the fixture.")
+    parser.add_argument('--budget-ms', type=float, default=1.0, help="Budget for the p99 lookup time (default 1).")
+    parser.add_argument('--save', action='store_true', help="Save the results for later comparison.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    fingerprint_ms = fingerprint_fixture(args.iterations)
+
+    fingerprints = [rng.getrandbits(near_duplicates.FINGERPRINT_BITS) for _ in range(args.articles)]
+    start = time.perf_counter()
+    index = build_index(fingerprints)
+    build_s = time.perf_counter() - start
+    # Tracing slows the build down, so the memory is measured on a second one
+    tracemalloc.start()
+    build_index(fingerprints)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    near = [flip_bits(rng.choice(fingerprints), rng.randint(0, index.max_distance), rng)
+            for _ in range(args.lookups)]
+    unrelated = [rng.getrandbits(near_duplicates.FINGERPRINT_BITS) for _ in range(args.lookups)]
+    near_times, near_found = time_lookups(index, near)
+    miss_times, false_matches = time_lookups(index, unrelated)
+
+    def p99(times):
+        return statistics.quantiles(times, n=100)[98]
+
+    metrics = {
+        'fingerprint_ms': fingerprint_ms,
+        'build_s': build_s,
+        'index_mib': peak / 1024 / 1024,
+        'lookup_near_median_ms': statistics.median(near_times),
+        'lookup_near_p99_ms': p99(near_times),
+        'lookup_miss_median_ms': statistics.median(miss_times),
+        'lookup_miss_p99_ms': p99(miss_times),
+    }
+    print(f"fingerprint fixture article: {fingerprint_ms:.2f} ms")
+    print(f"index of {args.articles} fingerprints: built in {build_s:.2f} s, {metrics['index_mib']:.0f} MiB "
+          f"(max distance {index.max_distance})")
+    print(f"near-duplicate lookups: median {metrics['lookup_near_median_ms'] * 1000:.1f} us, "
+          f"p99 {metrics['lookup_near_p99_ms'] * 1000:.1f} us, found {near_found}/{len(near)}")
+    print(f"unrelated lookups: median {metrics['lookup_miss_median_ms'] * 1000:.1f} us, "
+          f"p99 {metrics['lookup_miss_p99_ms'] * 1000:.1f} us, false matches {false_matches}/{len(unrelated)}")
+
+    if args.save:
+        params = {key: value for key, value in vars(args).items() if key != 'save'}
+        save_results('dedup', params, metrics)
+
+    failures = []
+    if near_found < len(near):
+        failures.append(f"{len(near) - near_found} near-duplicates were not found")
+    if max(metrics['lookup_near_p99_ms'], metrics['lookup_miss_p99_ms']) > args.budget_ms:
+        failures.append("p99 lookup time is over budget")
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == '__main__':
+    main()
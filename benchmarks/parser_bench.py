@@ -0,0 +1,122 @@
+"""
+Parser benchmark for scripts/scraper.py.
+
+Compares the original full-tree parse (`BeautifulSoup(text, 'html.parser')` over
+the whole page) with the targeted parser (SoupStrainer, straight from bytes)
+on saved fixture pages, reporting parse time and peak memory per page.
+
+    python benchmarks/parser_bench.py
+    python benchmarks/parser_bench.py --iterations 200
+    python benchmarks/parser_bench.py --save https://www.aivi.fyi/ listing.html
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from bs4 import BeautifulSoup
+
+from scripts import scraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+BASE_URL = scraper.TARGET_URL
+
+
+def legacy_parse_list(html: bytes):
+    """The pre-SoupStrainer listing parse, kept here as the benchmark baseline."""
+    soup = BeautifulSoup(html.decode('utf-8'), 'html.parser')
+    return soup.find_all('div', class_='list__item')
+
+
+def legacy_parse_article(html: bytes):
+    """The pre-SoupStrainer article parse, kept here as the benchmark baseline."""
+    soup = BeautifulSoup(html.decode('utf-8'), 'html.parser')
+    section = soup.find('section', class_='page__content')
+    content = "\n".join(p.get_text(strip=True) for p in section.find_all('p'))
+    soup.find('time', class_='dt-published')
+    soup.find('meta', property='article:published_time')
+    return content
+
+
+def targeted_parse_list(html: bytes):
+    return scraper.parse_article_list(html, BASE_URL, encoding='utf-8')
+
+
+def targeted_parse_article(html: bytes):
+    return scraper.parse_article_content(html, encoding='utf-8')
+
+
+PARSERS = {
+    'listing': (legacy_parse_list, targeted_parse_list),
+    'article': (legacy_parse_article, targeted_parse_article),
+}
+
+
+def measure(func, html: bytes, iterations: int) -> dict:
+    """Returns mean parse time (ms) and peak traced memory (KiB) for one page."""
+    func(html)  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(html)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'ms_per_page': elapsed / iterations * 1000, 'peak_kib': peak / 1024}
+
+
+def run(iterations: int) -> list:
+    results = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if not name.endswith('.html'):
+            continue
+        kind = 'listing' if 'listing' in name else 'article'
+        with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+            html = f.read()
+        legacy, targeted = PARSERS[kind]
+        for label, func in (('full-tree', legacy), (f'strained/{scraper.HTML_PARSER}', targeted)):
+            stats = measure(func, html, iterations)
+            results.append({'fixture': name, 'kib': len(html) / 1024, 'parser': label, **stats})
+    return results
+
+
+def save_fixture(url: str, name: str):
+    """Downloads a live page into the fixtures directory."""
+    response = scraper.get_client().fetch(url, timeout=15)
+    with open(os.path.join(FIXTURES_DIR, name), 'wb') as f:
+        f.write(response.content)
+    print(f"Saved {url} -> {name} ({len(response.content) / 1024:.1f} KiB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper HTML parsing on fixture pages.")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--save', nargs=2, metavar=('URL', 'NAME'),
+                        help="Save a live page as a fixture (NAME should contain 'listing' for list pages).")
+    args = parser.parse_args()
+
+    # Keep parser log lines out of the timing output
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.save:
+        save_fixture(*args.save)
+        return
+
+    print(f"{'fixture':<16}{'size KiB':>10}  {'parser':<22}{'ms/page':>10}{'peak KiB':>12}")
+    for row in run(args.iterations):
+        print(f"{row['fixture']:<16}{row['kib']:>10.1f}  {row['parser']:<22}"
+              f"{row['ms_per_page']:>10.2f}{row['peak_kib']:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
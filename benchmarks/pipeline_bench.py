@@ -0,0 +1,202 @@
+"""
+End-to-end benchmark of main_pipeline without network or LLM costs.
+
+A local threaded HTTP server serves a listing page with --articles entries
+(built from fixtures/listing.html) and the fixture article for every post, and
+a fake AIProvider answers after --llm-latency seconds. Each mode runs on an
+empty temporary database and reports wall time, articles/s and the time spent
+per stage (from the pipeline metrics; with concurrency, stage times overlap).
+
+    python benchmarks/pipeline_bench.py
+    python benchmarks/pipeline_bench.py --articles 100 --llm-latency 1.0 --fetch-latency 0.05 --save
+    python benchmarks/pipeline_bench.py --modes concurrent --ai-concurrency 8 --batch-size 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+_LIST_ITEM_RE = re.compile(r'<div class="list__item">.*?</article>\s*</div>\s*', re.S)
+_BATCH_ID_RE = re.compile(r'\[(\d+)\] 标题')
+
+
+def build_listing(count: int) -> bytes:
+    """The fixture listing page with its entries replaced by `count` generated ones."""
+    with open(os.path.join(FIXTURES_DIR, 'listing.html'), encoding='utf-8') as f:
+        html = f.read()
+    first = _LIST_ITEM_RE.search(html)
+    template = first.group(0)
+    items = "".join(
+        template.replace('/ai/post-0.html', f'/ai/post-{i}.html').replace('文章标题 0', f'基准文章 {i}')
+        for i in range(count)
+    )
+    return (html[:first.start()] + items + _LIST_ITEM_RE.sub('', html[first.start():])).encode('utf-8')
+
+
+class FixtureServer:
+    """Serves the generated listing at / and the fixture article at every /ai/post-N.html."""
+
+    def __init__(self, articles: int, latency: float):
+        listing = build_listing(articles)
+        with open(os.path.join(FIXTURES_DIR, 'article.html'), 'rb') as f:
+            article = f.read()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(latency)
+                body = listing if self.path == '/' else article if self.path.startswith('/ai/post-') else None
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def make_fake_provider(latency: float, jitter: float):
+    from app.core.ai_provider import AIProvider, RateLimitInfo
+
+    class FakeProvider(AIProvider):
+        """Answers every prompt (single or batch) with a fixed result after a simulated delay."""
+        provider_name = "fake"
+        model_id = "fake-model"
+
+        def __init__(self):
+            self._rng = random.Random(0)
+
+        def _delay(self) -> float:
+            return max(0.0, latency + self._rng.uniform(-jitter, jitter))
+
+        @staticmethod
+        def _answer(prompt: str):
+            result = {"summary": "基准测试生成的摘要。" * 10, "skills": ["要点一", "要点二", "要点三"]}
+            ids = _BATCH_ID_RE.findall(prompt)
+            if ids:
+                return {"results": [{"id": i, **result} for i in ids]}, RateLimitInfo()
+            return result, RateLimitInfo()
+
+        def request_structured_output(self, prompt: str):
+            time.sleep(self._delay())
+            return self._answer(prompt)
+
+        async def arequest_structured_output(self, prompt: str):
+            await asyncio.sleep(self._delay())
+            return self._answer(prompt)
+
+    return FakeProvider()
+
+
+def _reset_database():
+    from app.core.database import SessionLocal, init_db
+    from app.models.article import Article, ArticleSkill
+    from app.models.summary_cache import SummaryCache
+    init_db()
+    db = SessionLocal()
+    try:
+        db.query(ArticleSkill).delete()
+        db.query(Article).delete()
+        db.query(SummaryCache).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def run_mode(concurrent: bool, expected: int) -> dict:
+    from app.core.metrics import REGISTRY
+    from scripts.run_pipeline import main_pipeline
+
+    _reset_database()
+    REGISTRY.snapshot(reset=True)
+    start = time.perf_counter()
+    saved = main_pipeline(concurrent=concurrent)
+    wall = time.perf_counter() - start
+    if saved != expected:
+        print(f"Warning: saved {saved} of {expected} articles.", file=sys.stderr)
+
+    snapshot = REGISTRY.snapshot()
+    stats = {'wall_s': wall, 'articles_per_s': (saved or 0) / wall}
+    for labels, (_, total, _) in snapshot['pipeline_stage_duration_seconds'].items():
+        stats[f"stage_{dict(labels)['stage']}_s"] = total
+    llm_calls = snapshot['llm_request_duration_seconds']
+    stats['llm_calls'] = sum(count for _, _, count in llm_calls.values())
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the data pipeline against local fixtures.")
+    parser.add_argument('--articles', type=int, default=40)
+    parser.add_argument('--modes', default='sequential,concurrent')
+    parser.add_argument('--fetch-latency', type=float, default=0.02, help="Seconds per fixture page request.")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="Seconds per fake LLM call.")
+    parser.add_argument('--llm-jitter', type=float, default=0.1)
+    parser.add_argument('--scrape-concurrency', type=int, default=4)
+    parser.add_argument('--ai-concurrency', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=1, help="AI_BATCH_SIZE; 1 disables batching.")
+    parser.add_argument('--save', action='store_true', help="Save the results for later comparison.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix='pipeline-bench-')
+    # Settings are read when the app modules are imported, so they must be set first
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        'SNAPSHOT_DIR': os.path.join(workdir, 'snapshots'),
+        'SCRAPER_CACHE_MAX_MB': '0',
+        'SCRAPER_RATE_PER_HOST': '10000',
+        'SCRAPER_BURST': '10000',
+        'SCRAPE_CONCURRENCY': str(args.scrape_concurrency),
+        'AI_CONCURRENCY': str(args.ai_concurrency),
+        'AI_MAX_CONCURRENCY': str(args.ai_concurrency),
+        'AI_BATCH_SIZE': str(args.batch_size),
+        # Every post serves the same fixture article, which would otherwise all be near-duplicates
+        'DUPLICATE_DETECTION': 'false',
+    })
+
+    from app.core.ai_provider import ResilientAIClient, set_default_client
+    from scripts import scraper
+
+    server = FixtureServer(args.articles, args.fetch_latency)
+    scraper.TARGET_URL = server.url
+    set_default_client(ResilientAIClient([make_fake_provider(args.llm_latency, args.llm_jitter)]))
+
+    metrics = {}
+    try:
+        for mode in args.modes.split(','):
+            stats = run_mode(mode == 'concurrent', args.articles)
+            print(f"{mode}: " + ", ".join(f"{name}={value:.2f}" for name, value in stats.items()))
+            metrics.update({f"pipeline.{mode}.{name}": value for name, value in stats.items()})
+    finally:
+        server.close()
+
+    if args.save:
+        save_params = {key: value for key, value in vars(args).items() if key != 'save'}
+        from benchmarks.results import save_results
+        save_results('pipeline', save_params, metrics)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark result files.
+
+Every benchmark can save its numbers as one JSON file per run:
+
+    {"benchmark": "...", "params": {...}, "environment": {...}, "metrics": {"name": value, ...}}
+
+`environment` records the git commit (and whether the tree was dirty), so two
+files can be compared across commits with `python benchmarks/compare.py A B`.
+Metric names end with their unit; `_ms`/`_s` metrics are better when lower,
+`_per_s` metrics when higher.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(['git', *args], cwd=project_root, capture_output=True,
+                              text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def environment_info() -> dict:
+    return {
+        'commit': _git('rev-parse', '--short', 'HEAD') or 'unknown',
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def save_results(benchmark: str, params: dict, metrics: dict, path: str = None) -> str:
+    """Writes one result file and returns its path (default: results/<benchmark>-<commit>-<time>.json)."""
+    environment = environment_info()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = environment['timestamp'].replace(':', '').replace('-', '')
+        suffix = '-dirty' if environment['dirty'] else ''
+        path = os.path.join(RESULTS_DIR, f"{benchmark}-{environment['commit']}{suffix}-{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'benchmark': benchmark, 'params': params, 'environment': environment,
+                   'metrics': metrics}, f, indent=2, sort_keys=True)
+    print(f"Results saved to {os.path.relpath(path)}", file=sys.stderr)
+    return path
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
@@ -0,0 +1,137 @@
+"""
+Cold-start benchmark and budget check for the web process.
+
+Measures, each in a fresh interpreter:
+
+- the time to `import app.main`, and which heavy modules that import pulls in
+  (the AI client and the pipeline modules must only load in the pipeline
+  worker process), and whether it touched the database file;
+- the time from spawning uvicorn until /api/health first answers 200.
+
+Exits with status 1 when a median exceeds its budget or a forbidden module
+was imported, so it can run as a CI gate.
+
+    python benchmarks/startup_bench.py
+    python benchmarks/startup_bench.py --runs 10 --import-budget-ms 800 --save
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import httpx
+
+from benchmarks.results import save_results
+
+# Modules that only the pipeline worker needs
+FORBIDDEN_MODULES = ['openai', 'httpx', 'requests', 'bs4', 'uvicorn',
+                     'app.core.ai_provider', 'scripts.summarizer', 'scripts.run_pipeline']
+
+_IMPORT_PROBE = f"""
+import json, os, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    'import_ms': elapsed * 1000,
+    'modules': len(sys.modules),
+    'forbidden': [m for m in {FORBIDDEN_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_import(db_path: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    output = subprocess.run([sys.executable, '-c', _IMPORT_PROBE], cwd=project_root, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['touched_db'] = os.path.exists(db_path)
+    return result
+
+
+def measure_ready(db_path: str, port: int, timeout: float = 60) -> float:
+    """Milliseconds from spawning uvicorn until /api/health returns 200."""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1) as client:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/api/health").status_code == 200:
+                        return (time.perf_counter() - start) * 1000
+                except httpx.HTTPError:
+                    pass
+                if server.poll() is not None:
+                    sys.exit(f"The API server exited with status {server.returncode} during startup.")
+                time.sleep(0.01)
+        sys.exit(f"The API server did not become healthy within {timeout:.0f}s.")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the web process cold start against a budget.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=1000,
+                        help="Budget for the median `import app.main` time (default 1000).")
+    parser.add_argument('--ready-budget-ms', type=float, default=3000,
+                        help="Budget for the median spawn-to-healthy time (default 3000).")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--save', action='store_true', help="Save the results for later comparison.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='startup-bench-')
+    imports, ready = [], []
+    forbidden, touched_db = set(), False
+    for run in range(args.runs):
+        # A fresh database file per run, so the server start includes creating the tables
+        result = measure_import(os.path.join(workdir, f"import-{run}.db"))
+        imports.append(result['import_ms'])
+        forbidden.update(result['forbidden'])
+        touched_db = touched_db or result['touched_db']
+        ready.append(measure_ready(os.path.join(workdir, f"ready-{run}.db"), args.port))
+
+    metrics = {
+        'import_median_ms': statistics.median(imports),
+        'import_max_ms': max(imports),
+        'ready_median_ms': statistics.median(ready),
+        'ready_max_ms': max(ready),
+        'modules_loaded': result['modules'],
+    }
+    print(f"import app.main: median {metrics['import_median_ms']:.0f} ms, max {metrics['import_max_ms']:.0f} ms "
+          f"(budget {args.import_budget_ms:.0f} ms, {metrics['modules_loaded']} modules)")
+    print(f"spawn to healthy: median {metrics['ready_median_ms']:.0f} ms, max {metrics['ready_max_ms']:.0f} ms "
+          f"(budget {args.ready_budget_ms:.0f} ms)")
+
+    failures = []
+    if metrics['import_median_ms'] > args.import_budget_ms:
+        failures.append("import time is over budget")
+    if metrics['ready_median_ms'] > args.ready_budget_ms:
+        failures.append("time to healthy is over budget")
+    if forbidden:
+        failures.append(f"`import app.main` loaded {', '.join(sorted(forbidden))}")
+    if touched_db:
+        failures.append("`import app.main` created the database file")
+
+    if args.save:
+        params = {key: value for key, value in vars(args).items() if key not in ('save', 'port')}
+        save_results('startup', params, metrics)
+    if failures:
+        sys.exit("FAILED: " + "; ".join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Local stub of the Gemini and OpenAI-compatible chat APIs for testing and
+benchmarking the summarizer without a paid provider.
+
+    python benchmarks/stub_llm_server.py --port 8100 --latency 2.0 --jitter 0.5
+
+Then point the app at it, e.g.:
+
+    AI_PROVIDER=gemini GEMINI_API_KEY=stub GEMINI_API_BASE=http://127.0.0.1:8100/v1beta
+    AI_PROVIDER=openai OPENAI_API_KEY=stub OPENAI_API_BASE=http://127.0.0.1:8100/v1
+
+Every request sleeps for the configured latency and returns a valid
+{"summary", "skills"} object. --rate-limit-ratio makes that share of requests
+fail with 429 and rate-limit headers, to exercise retry behaviour.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+
+def create_app(latency: float = 1.0, jitter: float = 0.0, rate_limit_ratio: float = 0.0,
+               retry_after: float = 1.0, seed: int = None) -> FastAPI:
+    app = FastAPI(title="Stub LLM server")
+    rng = random.Random(seed)
+    stats = {"requests": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+
+    def summary_payload(prompt_text: str) -> str:
+        return json.dumps({
+            "summary": f"这是一段由本地桩服务生成的摘要（输入 {len(prompt_text)} 个字符）。",
+            "skills": ["要点一", "要点二", "要点三"],
+        }, ensure_ascii=False)
+
+    def rate_limited_response() -> JSONResponse:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"code": 429, "message": "Rate limit exceeded (stub)."}},
+            headers={
+                "Retry-After": str(retry_after),
+                "x-ratelimit-remaining-requests": "0",
+                "x-ratelimit-reset-requests": f"{retry_after}s",
+            },
+        )
+
+    async def simulate() -> bool:
+        """Sleeps for the configured latency; returns False if this request should be rate limited."""
+        stats["requests"] += 1
+        if rng.random() < rate_limit_ratio:
+            return False
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+        finally:
+            stats["in_flight"] -= 1
+        return True
+
+    @app.post("/v1beta/models/{model_action}")
+    async def gemini_generate_content(model_action: str, request: Request):
+        body = await request.json()
+        prompt_text = "".join(part.get("text", "") for c in body.get("contents", []) for part in c.get("parts", []))
+        if not await simulate():
+            return rate_limited_response()
+        return {
+            "candidates": [{"content": {"parts": [{"text": summary_payload(prompt_text)}], "role": "model"}}],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt_text) // 2,
+                "candidatesTokenCount": 120,
+                "totalTokenCount": len(prompt_text) // 2 + 120,
+            },
+        }
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat_completions(request: Request):
+        body = await request.json()
+        prompt_text = "".join(str(m.get("content", "")) for m in body.get("messages", []))
+        if not await simulate():
+            return rate_limited_response()
+        return JSONResponse(
+            content={
+                "id": f"chatcmpl-stub-{stats['requests']}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": summary_payload(prompt_text)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {
+                    "prompt_tokens": len(prompt_text) // 2,
+                    "completion_tokens": 120,
+                    "total_tokens": len(prompt_text) // 2 + 120,
+                },
+            },
+            headers={"x-ratelimit-remaining-requests": "1000", "x-ratelimit-reset-requests": "1s"},
+        )
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local stub LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per request.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter in seconds.")
+    parser.add_argument("--rate-limit-ratio", type=float, default=0.0,
+                        help="Share of requests answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.rate_limit_ratio, args.retry_after)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
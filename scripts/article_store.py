@@ -0,0 +1,25 @@
+import logging
+
+from app.crud import article as crud_article
+from app.core.metrics import PIPELINE_STAGE_SECONDS, PIPELINE_ARTICLES
+
+
+def save_articles(db, articles: list) -> int:
+    """
+    Saves a batch of summarized articles in a single transaction.
+    Returns the number of rows actually inserted (URLs that already exist are skipped).
+    """
+    if not articles:
+        return 0
+    logging.info(f"Step 4: Saving {len(articles)} articles to the database...")
+    with PIPELINE_STAGE_SECONDS.time(stage="db_write"):
+        inserted = crud_article.create_articles_bulk(db, articles)
+    PIPELINE_ARTICLES.inc(len(inserted), outcome="saved")
+    if len(inserted) < len(articles):
+        PIPELINE_ARTICLES.inc(len(articles) - len(inserted), outcome="duplicate")
+    for article in articles:
+        if article["url"] in inserted:
+            logging.info(f"✅ Successfully processed and saved '{article['title']}'.")
+        else:
+            logging.info(f"Article '{article['title']}' was saved by another run in the meantime. Skipping.")
+    return len(inserted)
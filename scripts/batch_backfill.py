@@ -0,0 +1,187 @@
+import argparse
+import json
+import logging
+import sys
+import os
+from datetime import datetime
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts import scraper
+from scripts import summarizer
+from scripts.article_store import save_articles
+from app.core.ai_provider import OpenAIClient
+from app.core.database import SessionLocal, init_db
+from app.crud import article as crud_article
+
+# Submitted batches and the article metadata needed to store their results
+BATCH_STATE_DIR = "./data/batches"
+
+# Batch statuses after which no more output will be produced
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def _get_openai_client() -> OpenAIClient:
+    """The Batch API is only offered by OpenAI-compatible providers (primary or failover)."""
+    for provider in getattr(summarizer.get_default_client(), "providers", []):
+        if isinstance(provider, OpenAIClient):
+            return provider
+    sys.exit("The offline batch mode needs an OpenAI-compatible provider "
+             "(AI_PROVIDER or AI_FAILOVER_PROVIDER set to 'openai').")
+
+def _state_path(batch_id: str) -> str:
+    return os.path.join(BATCH_STATE_DIR, f"{batch_id}.json")
+
+def _load_states() -> list:
+    if not os.path.isdir(BATCH_STATE_DIR):
+        return []
+    states = []
+    for name in sorted(os.listdir(BATCH_STATE_DIR)):
+        if name.endswith(".json"):
+            with open(os.path.join(BATCH_STATE_DIR, name), encoding="utf-8") as f:
+                states.append(json.load(f))
+    return states
+
+def _save_state(state: dict):
+    os.makedirs(BATCH_STATE_DIR, exist_ok=True)
+    tmp_path = _state_path(state["batch_id"]) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _state_path(state["batch_id"]))
+
+def submit(limit: int = None):
+    """Fetches new articles and submits their summarization requests as one batch job."""
+    client = _get_openai_client()
+    db = SessionLocal()
+    try:
+        articles_from_web = scraper.fetch_article_urls(scraper.TARGET_URL)
+        existing_urls = crud_article.get_existing_urls(db, [a['url'] for a in articles_from_web])
+        # Articles of batches that have not been collected yet must not be submitted twice
+        pending_urls = {a["url"] for s in _load_states() if not s.get("collected") for a in s["articles"].values()}
+        new_articles = [a for a in reversed(articles_from_web)
+                        if a['url'] not in existing_urls and a['url'] not in pending_urls]
+        if limit:
+            new_articles = new_articles[:limit]
+
+        batch_requests, articles, cached_articles = [], {}, []
+        for article_info in new_articles:
+            title, url = article_info['title'], article_info['url']
+            content_details = scraper.fetch_article_content(url)
+            if not content_details or not content_details.get("content"):
+                print(f"Could not fetch content for '{title}', skipping.")
+                continue
+            cache_key, cached, prompt = summarizer.prepare_offline_request(title, content_details["content"])
+            if cached is not None:
+                cached_articles.append({"title": title, "url": url, "published_date": content_details["published_date"],
+                                        "summary": cached["summary"], "skills": cached["skills"],
+                                        "content_hash": summarizer.content_hash(content_details["content"]),
+                                        "fetched_at": datetime.now()})
+                continue
+            if prompt is None:
+                print(f"'{title}' is too long for a single request, leaving it to the regular pipeline.")
+                continue
+            custom_id = f"article-{len(batch_requests)}"
+            batch_requests.append(client.build_batch_request(custom_id, prompt))
+            articles[custom_id] = {
+                "title": title,
+                "url": url,
+                "published_date": content_details["published_date"].isoformat(),
+                "cache_key": cache_key,
+                "content_hash": summarizer.content_hash(content_details["content"]),
+                "fetched_at": datetime.now().isoformat(),
+            }
+
+        if cached_articles:
+            print(f"Saved {save_articles(db, cached_articles)} articles straight from the summary cache.")
+        if not batch_requests:
+            print("No new articles to submit.")
+            return
+
+        batch_id = client.submit_batch(batch_requests, metadata={"source": "ai-time-tree backfill"})
+        _save_state({
+            "batch_id": batch_id,
+            "submitted_at": datetime.now().isoformat(),
+            "collected": False,
+            "articles": articles,
+        })
+        print(f"Submitted batch {batch_id} with {len(batch_requests)} articles.")
+    finally:
+        db.close()
+
+def show_status(batch_id: str = None):
+    """Prints the status of one batch, or of every batch that has not been collected yet."""
+    client = _get_openai_client()
+    states = [s for s in _load_states() if (s["batch_id"] == batch_id if batch_id else not s.get("collected"))]
+    if not states:
+        print("No pending batches.")
+        return
+    for state in states:
+        batch = client.get_batch(state["batch_id"])
+        counts = batch.request_counts
+        progress = f"{counts.completed}/{counts.total} done, {counts.failed} failed" if counts else ""
+        print(f"{state['batch_id']}: {batch.status} {progress} (submitted {state['submitted_at']})")
+
+def collect(batch_id: str):
+    """Stores the results of a finished batch; failed articles are retried by the next pipeline run."""
+    client = _get_openai_client()
+    with open(_state_path(batch_id), encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("collected"):
+        print(f"Batch {batch_id} has already been collected.")
+        return
+    batch = client.get_batch(batch_id)
+    if batch.status not in FINAL_STATUSES:
+        print(f"Batch {batch_id} is still {batch.status}, try again later.")
+        return
+
+    raw_results = client.get_batch_results(batch)
+    ready, failed = [], 0
+    for custom_id, article in state["articles"].items():
+        result = summarizer.finish_offline_result(article["cache_key"], raw_results.get(custom_id))
+        if not result:
+            failed += 1
+            continue
+        ready.append({
+            "title": article["title"],
+            "url": article["url"],
+            "published_date": datetime.fromisoformat(article["published_date"]),
+            "summary": result["summary"],
+            "skills": result["skills"],
+            # States written before content hashes were tracked don't have these keys
+            "content_hash": article.get("content_hash"),
+            "fetched_at": datetime.fromisoformat(article["fetched_at"]) if article.get("fetched_at") else None,
+        })
+
+    db = SessionLocal()
+    try:
+        saved = save_articles(db, ready)
+    finally:
+        db.close()
+    state["collected"] = True
+    _save_state(state)
+    print(f"Batch {batch_id} ({batch.status}): saved {saved} articles, {failed} failed "
+          f"and will be picked up by the next pipeline run.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Backfill article summaries through the offline Batch API of an OpenAI-compatible provider."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    submit_parser = subparsers.add_parser("submit", help="Fetch new articles and submit them as a batch job.")
+    submit_parser.add_argument("--limit", type=int, help="Submit at most this many articles.")
+    status_parser = subparsers.add_parser("status", help="Show the status of pending batch jobs.")
+    status_parser.add_argument("batch_id", nargs="?")
+    collect_parser = subparsers.add_parser("collect", help="Save the results of a finished batch job.")
+    collect_parser.add_argument("batch_id")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    init_db()
+    if args.command == "submit":
+        submit(args.limit)
+    elif args.command == "status":
+        show_status(args.batch_id)
+    else:
+        collect(args.batch_id)
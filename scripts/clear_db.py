@@ -8,15 +8,19 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from app.core.database import SessionLocal, engine
-from app.models.article import Article
+from app.models.article import Article, ArticleSkill
+from app.crud.dataset import bump_dataset_version
 
 logging.basicConfig(level=logging.INFO)
 
 def clear_articles_table():
-    """Deletes all records from the articles table."""
+    """Deletes all records from the articles table (and their skills)."""
     db = SessionLocal()
     try:
+        db.query(ArticleSkill).delete()
         num_rows_deleted = db.query(Article).delete()
+        # Bumped in the same transaction, so cached pages, ETags and snapshots of the deleted articles go stale
+        bump_dataset_version(db)
         db.commit()
         logging.info(f"Successfully deleted {num_rows_deleted} rows from the articles table.")
     except Exception as e:
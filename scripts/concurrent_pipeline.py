@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime
+
+from scripts import scraper
+from scripts import summarizer
+from scripts import near_duplicates
+from scripts.article_store import save_articles
+from app.crud import article as crud_article
+from app.core.database import SessionLocal, init_db
+from app.core.metrics import PIPELINE_STAGE_SECONDS, PIPELINE_ARTICLES
+from app.core.config import (
+    SCRAPE_CONCURRENCY, AI_CONCURRENCY, AI_MAX_CONCURRENCY, AI_BATCH_SIZE, WRITE_BATCH_SIZE, DUPLICATE_DETECTION
+)
+
+# Sentinel placed on a queue to tell a worker that no more items will follow.
+_STOP = object()
+
+
+class _OrderedResults:
+    """
+    Collects stage results keyed by their position in the processing order,
+    so the writer can persist articles in order while workers finish out of order.
+    A value of None marks an article that failed in some stage and must be skipped.
+    """
+    def __init__(self):
+        self._results = {}
+        self._condition = asyncio.Condition()
+
+    async def put(self, index: int, value):
+        async with self._condition:
+            self._results[index] = value
+            self._condition.notify_all()
+
+    def ready(self, index: int) -> bool:
+        return index in self._results
+
+    async def take(self, index: int):
+        async with self._condition:
+            await self._condition.wait_for(lambda: index in self._results)
+            return self._results.pop(index)
+
+
+async def _fetch_worker(fetch_queue: asyncio.Queue, summarize_queue: asyncio.Queue, results: _OrderedResults):
+    """Fetches article content in a thread and hands it over to the summarize stage."""
+    while True:
+        item = await fetch_queue.get()
+        if item is _STOP:
+            return
+        index, article_info = item
+        url, title = article_info['url'], article_info['title']
+        try:
+            logging.info(f"Fetching full content for '{url}'...")
+            content_details = await asyncio.to_thread(scraper.fetch_article_content, url)
+        except Exception as e:
+            logging.error(f"Unexpected error while fetching '{url}': {e}", exc_info=True)
+            content_details = None
+
+        if not content_details or not content_details.get("content"):
+            logging.error(f"Could not fetch content for '{title}'. Skipping.")
+            PIPELINE_ARTICLES.inc(outcome="fetch_failed")
+            await results.put(index, None)
+            continue
+
+        await summarize_queue.put((index, article_info, content_details))
+
+
+class _RunSummaries:
+    """
+    Near-duplicate bookkeeping shared by the summarize workers: the detector, plus a
+    future per article being summarized in this run that copies of it can wait for.
+    """
+    def __init__(self, detector):
+        self.detector = detector
+        self._futures = {}
+        # The detector's session is shared, so lookups from concurrent threads take turns
+        self._lookup_lock = threading.Lock()
+
+    def _fingerprint(self, content: str):
+        """
+        Runs in a worker thread: fingerprinting is CPU-bound and the saved-article
+        lookup queries the database, so neither may block the event loop. Returns
+        (fingerprint, saved) where `saved` is (url, summary result) of the saved
+        article the content duplicates, or None.
+        """
+        fingerprint = near_duplicates.simhash(content)
+        with self._lookup_lock:
+            saved = self.detector.find_saved(fingerprint)
+            if saved is None:
+                return fingerprint, None
+            # skill_names lazy-loads the skill rows, so it is read here as well
+            return fingerprint, (saved.url, {"summary": saved.summary, "skills": saved.skill_names})
+
+    async def check(self, index: int, url: str, content: str):
+        """
+        Returns (fingerprint, original_url, original_result) for a fetched article.
+        For a copy of a saved article both are set; for a copy of an article of this
+        run only the URL is (its result comes from wait_for); both are None when the
+        article has to be summarized (it is then registered for later copies).
+        """
+        fingerprint, saved = await asyncio.to_thread(self._fingerprint, content)
+        if saved is not None:
+            return (fingerprint, *saved)
+        # The in-run index and the futures are only touched on the event loop.
+        # Only earlier articles count, so the writer always saves the original first
+        original_url = self.detector.find_in_run(fingerprint, before=index)
+        if original_url is None and fingerprint is not None:
+            self.detector.add_to_run(url, fingerprint, position=index)
+            self._futures[url] = asyncio.get_running_loop().create_future()
+        return fingerprint, original_url, None
+
+    def set_result(self, url: str, ai_result):
+        future = self._futures.get(url)
+        if future is not None and not future.done():
+            future.set_result(ai_result)
+
+    async def wait_for(self, url: str):
+        return await self._futures[url]
+
+
+async def _summarize_worker(summarize_queue: asyncio.Queue, results: _OrderedResults, run: _RunSummaries = None):
+    """
+    Summarizes fetched content with AI and publishes the finished articles for writing.
+    In batch mode the worker also takes the articles already waiting in the queue,
+    up to AI_BATCH_SIZE, so batches fill up exactly when the AI stage is the bottleneck.
+    With `run`, near-duplicates reuse the summary of their original instead.
+    """
+    batch_size = max(1, AI_BATCH_SIZE)
+    stopped = False
+    while not stopped:
+        item = await summarize_queue.get()
+        if item is _STOP:
+            return
+        items = [item]
+        while len(items) < batch_size and not summarize_queue.empty():
+            item = summarize_queue.get_nowait()
+            if item is _STOP:
+                stopped = True
+                break
+            items.append(item)
+
+        # (index, article_info, content_details, fingerprint, original_url, original_result)
+        planned = []
+        for index, article_info, content_details in items:
+            check = (None, None, None)
+            if run is not None:
+                check = await run.check(index, article_info['url'], content_details["content"])
+            planned.append((index, article_info, content_details, *check))
+        to_summarize = [item for item in planned if item[4] is None]
+
+        for _, article_info, _, _, _, _ in to_summarize:
+            logging.info(f"Summarizing '{article_info['title']}' with AI...")
+        ai_results = []
+        if to_summarize:
+            try:
+                with PIPELINE_STAGE_SECONDS.time(stage="llm"):
+                    ai_results = await summarizer.asummarize_articles_batch([
+                        {"title": article_info['title'], "content": content_details["content"]}
+                        for _, article_info, content_details, _, _, _ in to_summarize
+                    ])
+            except Exception as e:
+                logging.error(f"Unexpected error while summarizing {len(to_summarize)} article(s): {e}", exc_info=True)
+                ai_results = [None] * len(to_summarize)
+
+        for (index, article_info, content_details, fingerprint, _, _), ai_result in zip(to_summarize, ai_results):
+            title = article_info['title']
+            if run is not None:
+                run.set_result(article_info['url'], ai_result)
+            if not ai_result:
+                logging.error(f"AI summarization failed for '{title}'. Skipping.")
+                PIPELINE_ARTICLES.inc(outcome="summarize_failed")
+                await results.put(index, None)
+                continue
+
+            await results.put(index, {
+                "title": title,
+                "url": article_info['url'],
+                "published_date": content_details["published_date"],
+                "summary": ai_result["summary"],
+                "skills": ai_result["skills"],
+                "content_hash": summarizer.content_hash(content_details["content"]),
+                "simhash": near_duplicates.to_db_value(fingerprint),
+                "fetched_at": datetime.now(),
+            })
+
+        # Copies are handled last: their original may be in this very batch
+        for index, article_info, content_details, fingerprint, original_url, original_result in planned:
+            if original_url is None:
+                continue
+            if original_result is None:
+                original_result = await run.wait_for(original_url)
+            if not original_result:
+                # The original failed in this run; the copy is retried with it next time
+                logging.error(f"Summary of the original of '{article_info['title']}' is missing. Skipping.")
+                PIPELINE_ARTICLES.inc(outcome="summarize_failed")
+                await results.put(index, None)
+                continue
+            await results.put(index, near_duplicates.duplicate_record(
+                article_info, content_details, original_url, original_result, fingerprint))
+
+
+async def _writer(db, total: int, results: _OrderedResults, batch_size: int) -> int:
+    """
+    Writes finished articles strictly in processing order. Returns the number saved.
+    Consecutive results that are already available are written together in one
+    transaction, up to `batch_size` articles.
+    """
+    saved = 0
+    batch = []
+    for index in range(total):
+        article = await results.take(index)
+        if article is not None:
+            batch.append(article)
+        next_ready = index + 1 < total and results.ready(index + 1)
+        if batch and (len(batch) >= batch_size or not next_ready):
+            saved += await asyncio.to_thread(save_articles, db, batch)
+            batch = []
+    return saved
+
+
+async def process_articles_concurrently(db, new_articles: list,
+                                        scrape_concurrency: int = SCRAPE_CONCURRENCY,
+                                        ai_concurrency: int = AI_MAX_CONCURRENCY) -> int:
+    """
+    Runs the fetch and summarize stages as bounded worker pools connected by queues.
+    `new_articles` must already be in the order they should be written (oldest first).
+    `ai_concurrency` is the number of summarize workers; the AI client's adaptive
+    limiter decides how many of them actually have a request in flight.
+    Returns the number of articles saved.
+    """
+    scrape_concurrency = max(1, scrape_concurrency)
+    ai_concurrency = max(1, ai_concurrency)
+
+    # Bounded queues apply backpressure so fetched pages don't pile up in memory
+    # while the (much slower) AI stage catches up.
+    fetch_queue = asyncio.Queue()
+    summarize_queue = asyncio.Queue(maxsize=max(ai_concurrency * 2, AI_BATCH_SIZE))
+    results = _OrderedResults()
+    detector = await asyncio.to_thread(near_duplicates.DuplicateDetector) if DUPLICATE_DETECTION and new_articles else None
+    run = _RunSummaries(detector) if detector else None
+
+    for index, article_info in enumerate(new_articles):
+        fetch_queue.put_nowait((index, article_info))
+    for _ in range(scrape_concurrency):
+        fetch_queue.put_nowait(_STOP)
+
+    fetchers = [asyncio.create_task(_fetch_worker(fetch_queue, summarize_queue, results))
+                for _ in range(scrape_concurrency)]
+    summarizers = [asyncio.create_task(_summarize_worker(summarize_queue, results, run))
+                   for _ in range(ai_concurrency)]
+    writer = asyncio.create_task(_writer(db, len(new_articles), results, max(1, WRITE_BATCH_SIZE)))
+
+    try:
+        await asyncio.gather(*fetchers)
+        for _ in range(ai_concurrency):
+            await summarize_queue.put(_STOP)
+        await asyncio.gather(*summarizers)
+        return await writer
+    finally:
+        for task in (*fetchers, *summarizers, writer):
+            task.cancel()
+        if detector:
+            detector.close()
+        # The AI client's async connection pool belongs to this event loop
+        ai_client = summarizer.get_default_client()
+        if ai_client:
+            await ai_client.aclose()
+
+
+def run_concurrent_pipeline():
+    """
+    Concurrent variant of `main_pipeline`: same steps, but content fetching and
+    AI summarization of new articles overlap instead of running one after another.
+    Returns the number of new articles saved.
+    """
+    logging.info("🚀 Starting the AI Time Tree data pipeline (concurrent mode)...")
+
+    db = None
+    try:
+        # Make sure all tables exist when the pipeline runs before the web app ever started
+        init_db()
+        db = SessionLocal()
+
+        logging.info("Step 1: Fetching article list from aivi.fyi...")
+        articles_from_web = scraper.fetch_article_urls(scraper.TARGET_URL)
+
+        if not articles_from_web:
+            logging.warning("No articles found on the website. Pipeline finished.")
+            return 0
+
+        logging.info(f"Found {len(articles_from_web)} articles on the website. Processing...")
+
+        existing_urls = crud_article.get_existing_urls(db, [a['url'] for a in articles_from_web])
+        logging.info(f"{len(existing_urls)} of them already exist in the database.")
+
+        # We process in reverse to handle the oldest articles first
+        new_articles = [a for a in reversed(articles_from_web) if a['url'] not in existing_urls]
+
+        logging.info(
+            f"{len(new_articles)} new articles to process "
+            f"(scrape concurrency={SCRAPE_CONCURRENCY}, "
+            f"AI concurrency={AI_CONCURRENCY} adapting up to {AI_MAX_CONCURRENCY})."
+        )
+        new_articles_processed = asyncio.run(process_articles_concurrently(db, new_articles))
+
+        cache_stats = summarizer.get_cache_stats()
+        logging.info(f"Pipeline finished. Processed {new_articles_processed} new articles "
+                     f"(summary cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses).")
+        return new_articles_processed
+
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during the pipeline: {e}", exc_info=True)
+        # Re-raised so the caller (and the web app's runner process) sees the run as failed
+        raise
+    finally:
+        if db:
+            db.close()
+            logging.info("Database session closed.")
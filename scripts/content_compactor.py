@@ -0,0 +1,104 @@
+import re
+import logging
+
+# Token counts here are estimates: we don't ship provider tokenizers, and the
+# budget only needs to be right to within a few percent. CJK characters cost
+# roughly one token each, other text about four characters per token.
+_TOKENS_PER_CHAR = {
+    # provider: (tokens per CJK character, tokens per other character)
+    "openai": (1.0, 0.25),
+    "gemini": (0.8, 0.25),
+}
+_DEFAULT_TOKENS_PER_CHAR = (1.0, 0.3)
+
+_CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]')
+_URL_RE = re.compile(r'https?://\S+')
+_CODE_CHARS = set('{}()[];=<>_/\\|`$#*&')
+
+# Paragraphs that are pure page boilerplate (share/follow/subscribe prompts etc.)
+_BOILERPLATE_RE = re.compile(
+    r'(分享到|点赞|转发|关注我|关注公众号|扫码|扫描二维码|订阅|打赏|赞赏|版权声明|未经允许|'
+    r'share (this|on)|subscribe|follow (me|us)|all rights reserved)',
+    re.IGNORECASE
+)
+# Boilerplate paragraphs are only dropped when they are short; a long paragraph
+# that merely mentions "订阅" is real content.
+_BOILERPLATE_MAX_LENGTH = 60
+# Paragraphs shorter than this (after removing URLs) carry too little text to keep,
+# unless they contain CJK characters, where a handful of characters can be a full sentence.
+_MIN_LATIN_LENGTH = 20
+# Share of code/punctuation symbols above which a paragraph is treated as a code dump.
+_CODE_SYMBOL_RATIO = 0.12
+
+
+def estimate_tokens(text: str, provider: str = None) -> int:
+    """Estimates the number of input tokens `text` costs with the given provider."""
+    cjk_rate, other_rate = _TOKENS_PER_CHAR.get(provider, _DEFAULT_TOKENS_PER_CHAR)
+    cjk = len(_CJK_RE.findall(text))
+    return int(cjk * cjk_rate + (len(text) - cjk) * other_rate) + 1
+
+
+def _is_low_information(paragraph: str) -> bool:
+    without_urls = _URL_RE.sub('', paragraph).strip()
+    if not without_urls:
+        return True
+    has_cjk = bool(_CJK_RE.search(without_urls))
+    if not has_cjk and len(without_urls) < _MIN_LATIN_LENGTH:
+        return True
+    if len(paragraph) <= _BOILERPLATE_MAX_LENGTH and _BOILERPLATE_RE.search(paragraph):
+        return True
+    if not has_cjk:
+        symbols = sum(1 for ch in without_urls if ch in _CODE_CHARS)
+        if symbols / len(without_urls) > _CODE_SYMBOL_RATIO:
+            return True
+    return False
+
+
+def compact_content(content: str) -> str:
+    """
+    Removes duplicate and low-information paragraphs (share links, bare URLs,
+    code dumps, repeated text) while keeping the original paragraph order.
+    """
+    kept = []
+    seen = set()
+    for paragraph in content.split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        fingerprint = " ".join(paragraph.lower().split())
+        if fingerprint in seen or _is_low_information(paragraph):
+            continue
+        seen.add(fingerprint)
+        kept.append(paragraph)
+
+    compacted = "\n".join(kept)
+    if len(compacted) < len(content):
+        logging.info(f"Compacted content from {len(content)} to {len(compacted)} characters.")
+    return compacted
+
+
+def split_into_chunks(content: str, max_tokens: int, provider: str = None) -> list:
+    """
+    Splits content on paragraph boundaries into chunks that each fit `max_tokens`.
+    A single paragraph that is larger than the budget is cut by characters.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for paragraph in content.split("\n"):
+        tokens = estimate_tokens(paragraph, provider)
+        if tokens > max_tokens:
+            # Proportional cut; estimate_tokens is roughly linear in length
+            step = max(1, int(len(paragraph) * max_tokens / tokens))
+            pieces = [paragraph[i:i + step] for i in range(0, len(paragraph), step)]
+        else:
+            pieces = [paragraph]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece, provider)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.config import (
+    SCRAPER_RATE_PER_HOST, SCRAPER_BURST,
+    SCRAPER_MAX_RETRIES, SCRAPER_BACKOFF_FACTOR,
+    SCRAPER_CACHE_DIR, SCRAPER_CACHE_MAX_MB,
+    SCRAPE_CONCURRENCY
+)
+
+# 所有抓取请求共用的请求头
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# 这些状态码通常是暂时性的（限流或服务端故障），值得退避后重试
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限速器。
+    以 rate 个/秒的速度补充令牌，最多积累 capacity 个；每次请求消耗一个令牌，没有令牌时阻塞等待。
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# 当前线程正在发起的请求所属站点的令牌桶，见 _RateLimitedRetry
+_current_request = threading.local()
+
+
+class _RateLimitedRetry(Retry):
+    """
+    urllib3 在连接适配器内部重试，不会再经过 ScraperClient.get() 的限速。
+    重试与原请求在同一线程中进行，这里在每次退避等待之后再从该站点的令牌桶取一个令牌，
+    重试的请求同样计入 SCRAPER_RATE_PER_HOST。
+    """
+    def sleep(self, response=None):
+        super().sleep(response)
+        bucket = getattr(_current_request, "bucket", None)
+        if bucket is not None:
+            bucket.acquire()
+
+
+@dataclass
+class FetchResult:
+    """一次抓取的结果。from_cache 为 True 表示服务器返回 304，正文来自本地缓存。"""
+    url: str
+    status_code: int
+    content: bytes
+    encoding: Optional[str]
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class HTTPCache:
+    """
+    保存响应正文及其 ETag/Last-Modified 的磁盘缓存，用于发起条件请求。
+    每个 URL 对应两个文件：<key>.json 保存元数据，<key>.body 保存正文。
+    总大小超过上限时，按最近使用时间淘汰最久未用的条目。
+    """
+    def __init__(self, directory: str = SCRAPER_CACHE_DIR, max_bytes: int = int(SCRAPER_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".json", base + ".body"
+
+    def load(self, url: str) -> Optional[dict]:
+        """返回缓存条目的元数据（不含正文），不存在时返回 None。"""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def read_body(self, url: str) -> Optional[bytes]:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(body_path, "rb") as f:
+                body = f.read()
+            # 更新修改时间，作为 LRU 淘汰的依据
+            os.utime(meta_path)
+            return body
+        except OSError:
+            return None
+
+    def store(self, url: str, content: bytes, encoding: Optional[str], etag: Optional[str], last_modified: Optional[str]):
+        if len(content) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+            "size": len(content),
+            "stored_at": time.time(),
+        }
+        with self._lock:
+            previous = self.load(url)
+            # 先写临时文件再原子替换，避免并发读取到写了一半的文件
+            for path, data, mode in ((body_path, content, "wb"), (meta_path, json.dumps(meta), "w")):
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, mode) as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            self._ensure_total_bytes()
+            self._total_bytes += len(content) - (previous["size"] if previous else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _ensure_total_bytes(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(meta["size"] for _, _, meta in self._entries())
+
+    def _entries(self):
+        """遍历所有缓存条目，返回 (最近使用时间, 元数据文件路径, 元数据)。"""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                entries.append((os.path.getmtime(path), path, meta))
+            except (OSError, ValueError):
+                continue
+        return entries
+
+    def _evict(self):
+        # 目标是降到上限的 90%，避免每次写入都触发一次全目录扫描
+        target = self.max_bytes * 0.9
+        for _, meta_path, meta in sorted(self._entries(), key=lambda entry: entry[0]):
+            if self._total_bytes <= target:
+                break
+            for path in (meta_path, meta_path[:-len(".json")] + ".body"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes -= meta.get("size", 0)
+        logging.info(f"HTTP 缓存淘汰完成，当前占用约 {self._total_bytes / 1024 / 1024:.1f} MB。")
+
+
+class ScraperClient:
+    """
+    爬虫共用的 HTTP 客户端：
+    - 基于 requests.Session 的 keep-alive 连接池，同一站点的请求复用 TCP/TLS 连接；
+    - 对 429/5xx 和连接错误做有上限的指数退避重试，并遵守 Retry-After 响应头；
+    - 按站点 (host) 的令牌桶限速，每次尝试（包括重试）消耗一个令牌，避免抓取过快被目标站点封禁；
+    - 可选的磁盘缓存：fetch() 带上 If-None-Match/If-Modified-Since，页面未变化时复用本地正文。
+    """
+    def __init__(self, rate_per_host: float = SCRAPER_RATE_PER_HOST, burst: int = SCRAPER_BURST,
+                 max_retries: int = SCRAPER_MAX_RETRIES, backoff_factor: float = SCRAPER_BACKOFF_FACTOR,
+                 pool_size: int = max(SCRAPE_CONCURRENCY, 4), cache: Optional[HTTPCache] = None):
+        self.cache = cache
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+        retry = _RateLimitedRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=("GET", "HEAD"),
+            respect_retry_after_header=True,
+            raise_on_status=False,  # 重试耗尽后返回最后一个响应，由调用方 raise_for_status()
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _bucket_for(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self._buckets_lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+            return bucket
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """按目标站点限速后发起 GET 请求，返回 requests.Response。适配器内部的重试同样限速。"""
+        bucket = self._bucket_for(url)
+        bucket.acquire()
+        _current_request.bucket = bucket
+        try:
+            return self.session.get(url, **kwargs)
+        finally:
+            _current_request.bucket = None
+
+    def fetch(self, url: str, **kwargs) -> FetchResult:
+        """
+        抓取页面正文。启用缓存时发起条件请求，服务器返回 304 则直接使用缓存的正文。
+        请求失败或状态码异常时抛出 requests.RequestException。
+        """
+        cached = self.cache.load(url) if self.cache else None
+        headers = dict(kwargs.pop("headers", None) or {})
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached:
+            body = self.cache.read_body(url)
+            if body is not None:
+                logging.info(f"页面未变化 (304)，使用本地缓存: {url}")
+                return FetchResult(url=url, status_code=200, content=body,
+                                   encoding=cached.get("encoding"), from_cache=True)
+            # 缓存正文已丢失，去掉条件请求头重新完整抓取
+            response = self.get(url, **kwargs)
+
+        response.raise_for_status()
+        # 只记录响应头中明确声明的字符集；没有声明时交给 HTML 解析器根据 <meta charset> 自行判断，
+        # 而不是使用 requests 对 text/* 默认假定的 ISO-8859-1
+        encoding = response.encoding if "charset" in response.headers.get("Content-Type", "").lower() else None
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.cache and (etag or last_modified):
+            try:
+                self.cache.store(url, response.content, encoding, etag, last_modified)
+            except OSError as e:
+                logging.warning(f"写入 HTTP 缓存失败: {e}")
+        return FetchResult(url=url, status_code=response.status_code, content=response.content, encoding=encoding)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ScraperClient:
+    """返回进程内共享的 ScraperClient，首次调用时创建。"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            logging.info("初始化共享的抓取客户端 (连接池 + 重试 + 按站点限速)...")
+            cache = HTTPCache() if SCRAPER_CACHE_MAX_MB > 0 else None
+            _client = ScraperClient(cache=cache)
+        return _client
@@ -7,9 +7,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from app.core.database import engine, Base
-# We need to import the models so that Base knows about them
-from app.models import article
+from app.core.database import init_db
 
 logging.basicConfig(level=logging.INFO)
 
@@ -20,9 +18,9 @@ def initialize_database():
     """
     logging.info("Initializing database...")
     try:
-        # The create_all function checks for the existence of tables
-        # before creating them, so it's safe to run multiple times.
-        Base.metadata.create_all(bind=engine)
+        # Only missing tables and indexes are created,
+        # so it's safe to run multiple times.
+        init_db()
         logging.info("Database tables created successfully (if they didn't exist).")
     except Exception as e:
         logging.error(f"An error occurred during database initialization: {e}")
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import os
+
+# Add project root to Python path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.core.database import SessionLocal, init_db
+from app.crud import summary_cache as crud_summary_cache
+from scripts.summarizer import PROMPT_VERSION
+
+def show_stats():
+    """Prints cache entries and accumulated hits per prompt version / provider / model."""
+    db = SessionLocal()
+    try:
+        rows = crud_summary_cache.get_summary_cache_stats(db)
+    finally:
+        db.close()
+    print(f"Current prompt version: {PROMPT_VERSION}")
+    if not rows:
+        print("The summary cache is empty.")
+        return
+    print(f"{'prompt':<10}{'provider':<10}{'model':<32}{'entries':>9}{'hits':>9}")
+    for row in rows:
+        marker = "" if row["prompt_version"] == PROMPT_VERSION else "  (stale)"
+        print(f"{row['prompt_version']:<10}{row['provider']:<10}{row['model_id']:<32}"
+              f"{row['entries']:>9}{row['hits']:>9}{marker}")
+
+def invalidate(all_entries: bool):
+    """Deletes entries from older prompt versions, or every entry with --all."""
+    db = SessionLocal()
+    try:
+        keep = None if all_entries else PROMPT_VERSION
+        deleted = crud_summary_cache.invalidate_summaries(db, keep_prompt_version=keep)
+        print(f"Deleted {deleted} summary cache entries.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the AI summary cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show cache entries and hit counts.")
+    invalidate_parser = subparsers.add_parser(
+        "invalidate", help="Delete entries produced with an older prompt version."
+    )
+    invalidate_parser.add_argument("--all", action="store_true", help="Delete every entry.")
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "stats":
+        show_stats()
+    else:
+        invalidate(args.all)
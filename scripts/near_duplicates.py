@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import re
+from array import array
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import DUPLICATE_MAX_DISTANCE
+from app.core.database import SessionLocal
+from app.core.metrics import PIPELINE_ARTICLES
+from app.crud import article as crud_article
+from scripts.summarizer import normalize_content, content_hash
+
+# Near-duplicate detection: cross-posted or syndicated copies of an article live
+# under different URLs, so the URL check doesn't catch them. Every article gets a
+# 64-bit SimHash of its normalized text; texts that differ only slightly (a
+# different header or footer, a fixed typo) end up a few bits apart.
+#
+# Lookups use LSH banding: the fingerprint is split into DUPLICATE_MAX_DISTANCE + 1
+# bands, and two fingerprints within that Hamming distance must agree exactly on at
+# least one band (pigeonhole). A lookup therefore only compares against the few
+# fingerprints sharing a band value, which stays well under a millisecond at 1M
+# articles (see benchmarks/dedup_bench.py).
+
+FINGERPRINT_BITS = 64
+_SIGNED_OFFSET = 1 << FINGERPRINT_BITS
+_SIGNED_MAX = 1 << (FINGERPRINT_BITS - 1)
+
+# Each CJK character is a token of its own, other text is split into words
+_TOKEN_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]|[^\W_]+')
+# Features are overlapping runs of this many tokens
+_SHINGLE_SIZE = 3
+# Texts with fewer features than this have unstable fingerprints and aren't checked
+_MIN_FEATURES = 20
+
+
+def simhash(content: str) -> Optional[int]:
+    """
+    Returns the 64-bit SimHash of the normalized content, or None when the text is
+    too short to fingerprint reliably.
+    """
+    tokens = _TOKEN_RE.findall(normalize_content(content).lower())
+    features = Counter(
+        " ".join(tokens[i:i + _SHINGLE_SIZE]) for i in range(max(0, len(tokens) - _SHINGLE_SIZE + 1))
+    )
+    if len(features) < _MIN_FEATURES:
+        return None
+
+    # Instead of adding every feature's weight to 64 bit counters, add it to one
+    # counter per (byte position, byte value) and fold those into bit totals at the end.
+    byte_weights = [[0] * 256 for _ in range(FINGERPRINT_BITS // 8)]
+    for feature, weight in features.items():
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=FINGERPRINT_BITS // 8).digest()
+        for position, value in enumerate(digest):
+            byte_weights[position][value] += weight
+
+    total = sum(features.values())
+    fingerprint = 0
+    for position, weights in enumerate(byte_weights):
+        for bit in range(8):
+            set_weight = sum(w for value, w in enumerate(weights) if value >> bit & 1)
+            # Bit is set when the features with that bit outweigh the ones without it
+            if 2 * set_weight > total:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def to_db_value(fingerprint: Optional[int]) -> Optional[int]:
+    """Maps an unsigned fingerprint onto the signed 64-bit integer range databases store."""
+    if fingerprint is None:
+        return None
+    return fingerprint - _SIGNED_OFFSET if fingerprint >= _SIGNED_MAX else fingerprint
+
+
+def from_db_value(value: Optional[int]) -> Optional[int]:
+    if value is None:
+        return None
+    return value + _SIGNED_OFFSET if value < 0 else value
+
+
+class SimHashIndex:
+    """
+    In-memory LSH index of fingerprints, each stored with an integer reference
+    (an article id, or a position in the current run).
+    Buckets hold positions in compact arrays, so 1M fingerprints take tens of MB.
+    """
+
+    def __init__(self, max_distance: int = DUPLICATE_MAX_DISTANCE):
+        self.max_distance = max(0, min(max_distance, FINGERPRINT_BITS - 1))
+        band_count = self.max_distance + 1
+        # Uneven splits put the extra bits in the first bands
+        widths = [FINGERPRINT_BITS // band_count + (1 if i < FINGERPRINT_BITS % band_count else 0)
+                  for i in range(band_count)]
+        self._bands = []
+        shift = 0
+        for width in widths:
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+        self._buckets = [{} for _ in self._bands]
+        self._fingerprints = array("Q")
+        self._refs = array("q")
+
+    def __len__(self):
+        return len(self._refs)
+
+    def add(self, ref: int, fingerprint: int):
+        position = len(self._refs)
+        self._fingerprints.append(fingerprint)
+        self._refs.append(ref)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            key = fingerprint >> shift & mask
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = array("I", (position,))
+            else:
+                bucket.append(position)
+
+    def find(self, fingerprint: int, ref_below: int = None) -> Optional[tuple]:
+        """
+        Returns (ref, distance) of the closest fingerprint within max_distance, or None.
+        With `ref_below`, only fingerprints stored with a smaller ref are candidates.
+        """
+        best = None
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for position in buckets.get(fingerprint >> shift & mask, ()):
+                if ref_below is not None and self._refs[position] >= ref_below:
+                    continue
+                distance = (self._fingerprints[position] ^ fingerprint).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (self._refs[position], distance)
+                    if distance == 0:
+                        return best
+        return best
+
+
+class DuplicateDetector:
+    """
+    Checks fetched articles against the articles already saved and against the
+    ones seen earlier in the same pipeline run, before they are sent to the AI.
+    Uses its own database session, so it can be called while the pipeline's
+    session is busy writing in another thread.
+    """
+
+    def __init__(self):
+        self._db = SessionLocal()
+        self._saved = SimHashIndex()
+        for article_id, value in crud_article.get_article_fingerprints(self._db):
+            self._saved.add(article_id, from_db_value(value))
+        # Articles of this run, referenced by their position in the processing order
+        self._run = SimHashIndex()
+        self._run_urls = {}
+        logging.info(f"Loaded {len(self._saved)} article fingerprints for near-duplicate detection.")
+
+    def find_saved(self, fingerprint: Optional[int]):
+        """Returns the saved article the content duplicates, or None."""
+        if fingerprint is None:
+            return None
+        match = self._saved.find(fingerprint)
+        return crud_article.get_article(self._db, match[0]) if match else None
+
+    def find_in_run(self, fingerprint: Optional[int], before: int = None) -> Optional[str]:
+        """
+        Returns the URL of an article registered earlier in this run that the content
+        duplicates, or None. With `before`, only articles at a smaller position count,
+        so the original is always written first.
+        """
+        if fingerprint is None:
+            return None
+        # Later articles are skipped before picking the closest, so a closer later
+        # one doesn't hide an earlier one that is also within range
+        match = self._run.find(fingerprint, ref_below=before)
+        return self._run_urls[match[0]] if match else None
+
+    def add_to_run(self, url: str, fingerprint: Optional[int], position: int = None):
+        """
+        Registers an article of this run that is being summarized, so later copies can
+        reuse its summary. `position` defaults to the registration order.
+        """
+        if fingerprint is None:
+            return
+        if position is None:
+            position = len(self._run)
+        self._run.add(position, fingerprint)
+        self._run_urls[position] = url
+
+    def close(self):
+        self._db.close()
+
+
+def duplicate_record(article_info: dict, content_details: dict, original_url: str, result: dict, fingerprint: int) -> dict:
+    """Builds the article to save for a near-duplicate, reusing the summary of its original."""
+    logging.info(f"'{article_info['title']}' is a near-duplicate of {original_url}, reusing its summary.")
+    PIPELINE_ARTICLES.inc(outcome="near_duplicate")
+    return {
+        "title": article_info['title'],
+        "url": article_info['url'],
+        "published_date": content_details["published_date"],
+        "summary": result["summary"],
+        "skills": result["skills"],
+        "content_hash": content_hash(content_details["content"]),
+        "simhash": to_db_value(fingerprint),
+        "fetched_at": datetime.now(),
+        "duplicate_of": original_url,
+    }
@@ -1,7 +1,7 @@
 import logging
 import sys
 import os
-import json
+from datetime import datetime, timedelta
 
 # Configure logging right at the start
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -28,23 +28,233 @@ logging.info(".env loading process finished.")
 logging.info("Importing local modules (scraper, summarizer)...")
 from scripts import scraper
 from scripts import summarizer
+from scripts import near_duplicates
+from scripts.article_store import save_articles
 from app.crud import article as crud_article
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, init_db
+from app.core.config import (
+    PIPELINE_CONCURRENT, PIPELINE_REFRESH, REFRESH_INTERVAL_HOURS, WRITE_BATCH_SIZE, AI_BATCH_SIZE,
+    DUPLICATE_DETECTION
+)
+from app.core.metrics import PIPELINE_STAGE_SECONDS, PIPELINE_ARTICLES
+from app.core.snapshots import build_snapshots
 logging.info("Local modules imported successfully.")
 
-def main_pipeline():
+def _summarize_fetched(fetched_articles: list, detector=None, run_results: dict = None) -> list:
+    """
+    Summarizes fetched articles with AI (several per request when AI_BATCH_SIZE > 1)
+    and returns the ones that are ready to be saved.
+
+    With a `detector` (see `scripts.near_duplicates`), near-duplicates of saved
+    articles or of articles summarized earlier in this run reuse their summary
+    instead of being sent to the AI. `run_results` maps the URLs of this run's
+    summarized articles to their results and is updated in place.
+    """
+    if not fetched_articles:
+        return []
+    run_results = {} if run_results is None else run_results
+
+    # (article_info, content_details, fingerprint, original URL or None)
+    planned = []
+    for article_info, content_details in fetched_articles:
+        fingerprint = near_duplicates.simhash(content_details["content"]) if detector else None
+        original_url = None
+        if fingerprint is not None:
+            saved = detector.find_saved(fingerprint)
+            if saved is not None:
+                original_url = saved.url
+                run_results.setdefault(saved.url, {"summary": saved.summary, "skills": saved.skill_names})
+            else:
+                original_url = detector.find_in_run(fingerprint)
+            if original_url is None:
+                detector.add_to_run(article_info['url'], fingerprint)
+        planned.append((article_info, content_details, fingerprint, original_url))
+
+    to_summarize = [item for item in planned if item[3] is None]
+    if to_summarize:
+        logging.info(f"Step 3: Summarizing {len(to_summarize)} article(s) with AI...")
+        with PIPELINE_STAGE_SECONDS.time(stage="llm"):
+            ai_results = summarizer.summarize_articles_batch([
+                {"title": article_info['title'], "content": content_details["content"]}
+                for article_info, content_details, _, _ in to_summarize
+            ])
+        for (article_info, _, _, _), ai_result in zip(to_summarize, ai_results):
+            run_results[article_info['url']] = ai_result
+
+    ready = []
+    for article_info, content_details, fingerprint, original_url in planned:
+        if original_url is not None:
+            original_result = run_results.get(original_url)
+            if not original_result:
+                # The original failed in this run; the copy is retried with it next time
+                logging.error(f"Summary of the original of '{article_info['title']}' is missing. Skipping.")
+                PIPELINE_ARTICLES.inc(outcome="summarize_failed")
+                continue
+            ready.append(near_duplicates.duplicate_record(
+                article_info, content_details, original_url, original_result, fingerprint))
+            continue
+        ai_result = run_results.get(article_info['url'])
+        if not ai_result:
+            logging.error(f"AI summarization failed for '{article_info['title']}'. Skipping.")
+            PIPELINE_ARTICLES.inc(outcome="summarize_failed")
+            continue
+        ready.append({
+            "title": article_info['title'],
+            "url": article_info['url'],
+            "published_date": content_details["published_date"],
+            "summary": ai_result["summary"],
+            "skills": ai_result["skills"],
+            "content_hash": summarizer.content_hash(content_details["content"]),
+            "simhash": near_duplicates.to_db_value(fingerprint),
+            "fetched_at": datetime.now(),
+        })
+    return ready
+
+def main_pipeline(concurrent: bool = None, refresh: bool = None):
     """
     Executes the full data processing pipeline:
     1. Scrapes article URLs.
     2. Checks for new articles against the database.
     3. Fetches content for new articles.
-    4. Summarizes content with AI.
+    4. Summarizes content with AI; near-duplicates of known articles reuse their
+       summary instead (see `scripts.near_duplicates`).
     5. Saves the result to the database.
+    6. Pre-renders the first timeline pages (see `app.core.snapshots`).
+
+    When `concurrent` is true (defaults to the PIPELINE_CONCURRENT setting),
+    steps 3 and 4 run as bounded worker pools, see `scripts.concurrent_pipeline`.
+
+    When `refresh` is true (defaults to the PIPELINE_REFRESH setting), existing
+    articles that were last fetched more than REFRESH_INTERVAL_HOURS ago are
+    re-fetched before step 6, and re-summarized only if their content changed.
+
+    Returns the number of new articles saved. Errors are logged and re-raised,
+    so a failed run is never reported as a successful one.
     """
+    if concurrent is None:
+        concurrent = PIPELINE_CONCURRENT
+    if refresh is None:
+        refresh = PIPELINE_REFRESH
+    if concurrent:
+        from scripts.concurrent_pipeline import run_concurrent_pipeline
+        new_articles_processed = run_concurrent_pipeline()
+    else:
+        new_articles_processed = _run_sequential_pipeline()
+    if refresh:
+        _refresh_existing_articles()
+    _build_timeline_snapshots()
+    return new_articles_processed
+
+def _refresh_existing_articles() -> int:
+    """
+    Re-fetches existing articles that are due for a refresh and compares the hash of
+    their normalized content with the stored one. The page fetches are conditional
+    requests (see `scripts.http_client`), so unchanged pages usually cost a 304; only
+    articles whose content hash changed are sent to the AI again.
+
+    Articles saved before content hashes were tracked get their current hash and
+    SimHash fingerprint recorded as a baseline without being re-summarized.
+
+    Returns the number of articles re-summarized.
+    """
+    logging.info("🔄 Refreshing existing articles...")
+    db = None
+    try:
+        init_db()
+        db = SessionLocal()
+        articles_from_web = scraper.fetch_article_urls(scraper.TARGET_URL)
+        if not articles_from_web:
+            logging.warning("No articles found on the website. Nothing to refresh.")
+            return 0
+
+        fetched_before = datetime.now() - timedelta(hours=REFRESH_INTERVAL_HOURS)
+        due = {row.url: row for row in crud_article.get_articles_due_for_refresh(
+            db, [a['url'] for a in articles_from_web], fetched_before)}
+        logging.info(f"{len(due)} existing article(s) are due for a refresh.")
+
+        unchanged, changed = {}, []
+        for article_info in reversed(articles_from_web):
+            row = due.pop(article_info['url'], None)
+            if row is None:
+                continue
+            content_details = scraper.fetch_article_content(row.url)
+            if not content_details or not content_details.get("content"):
+                logging.error(f"Could not re-fetch content for '{article_info['title']}'. Skipping.")
+                PIPELINE_ARTICLES.inc(outcome="fetch_failed")
+                continue
+            new_hash = summarizer.content_hash(content_details["content"])
+            fingerprint = near_duplicates.to_db_value(near_duplicates.simhash(content_details["content"]))
+            if row.content_hash is None or row.content_hash == new_hash:
+                unchanged[row.id] = (new_hash, fingerprint)
+            else:
+                logging.info(f"Content of '{article_info['title']}' has changed, summarizing again.")
+                changed.append((row.id, article_info, content_details, new_hash, fingerprint))
+
+        fetched_at = datetime.now()
+        with PIPELINE_STAGE_SECONDS.time(stage="db_write"):
+            crud_article.mark_articles_fetched(db, unchanged, fetched_at)
+        PIPELINE_ARTICLES.inc(len(unchanged), outcome="unchanged")
+
+        refreshed = 0
+        batch_size = max(1, AI_BATCH_SIZE)
+        for start in range(0, len(changed), batch_size):
+            group = changed[start:start + batch_size]
+            with PIPELINE_STAGE_SECONDS.time(stage="llm"):
+                ai_results = summarizer.summarize_articles_batch([
+                    {"title": article_info['title'], "content": content_details["content"]}
+                    for _, article_info, content_details, _, _ in group
+                ])
+            updates = []
+            for (article_id, article_info, content_details, new_hash, fingerprint), ai_result in zip(group, ai_results):
+                if not ai_result:
+                    # The stored hash is left as is, so the next run tries again
+                    logging.error(f"AI summarization failed for '{article_info['title']}'. Keeping the old summary.")
+                    PIPELINE_ARTICLES.inc(outcome="summarize_failed")
+                    continue
+                updates.append({
+                    "id": article_id,
+                    "title": article_info['title'],
+                    "published_date": content_details["published_date"],
+                    "summary": ai_result["summary"],
+                    "skills": ai_result["skills"],
+                    "content_hash": new_hash,
+                    "simhash": fingerprint,
+                    "fetched_at": fetched_at,
+                })
+            with PIPELINE_STAGE_SECONDS.time(stage="db_write"):
+                refreshed += crud_article.update_articles_content(db, updates)
+            PIPELINE_ARTICLES.inc(len(updates), outcome="refreshed")
+
+        logging.info(f"Refresh finished. {len(unchanged)} unchanged, {refreshed} re-summarized.")
+        return refreshed
+
+    except Exception as e:
+        logging.error(f"An unexpected error occurred while refreshing articles: {e}", exc_info=True)
+        raise
+    finally:
+        if db:
+            db.close()
+
+def _build_timeline_snapshots():
+    """Pre-renders and pre-compresses the first timeline pages for the web app, see app.core.snapshots."""
+    db = SessionLocal()
+    try:
+        with PIPELINE_STAGE_SECONDS.time(stage="snapshot"):
+            build_snapshots(db)
+    except Exception as e:
+        # The web app falls back to rendering the pages itself
+        logging.error(f"Failed to build timeline snapshots: {e}", exc_info=True)
+    finally:
+        db.close()
+
+def _run_sequential_pipeline():
     logging.info("🚀 Starting the AI Time Tree data pipeline...")
     
     db = None
+    detector = None
     try:
+        # Make sure all tables exist when the pipeline runs before the web app ever started
+        init_db()
         db = SessionLocal()
         
         # 1. Scrape article URLs from the main page
@@ -53,21 +263,28 @@ def main_pipeline():
         
         if not articles_from_web:
             logging.warning("No articles found on the website. Pipeline finished.")
-            return
+            return 0
 
         logging.info(f"Found {len(articles_from_web)} articles on the website. Processing...")
         
+        # 2. Check which articles already exist in the DB with a single bulk lookup
+        existing_urls = crud_article.get_existing_urls(db, [a['url'] for a in articles_from_web])
+        logging.info(f"{len(existing_urls)} of them already exist in the database.")
+
+        if DUPLICATE_DETECTION and len(existing_urls) < len(articles_from_web):
+            detector = near_duplicates.DuplicateDetector()
+        run_results = {}
+
         new_articles_processed = 0
+        pending_articles = []
+        # Fetched articles waiting for AI; in batch mode several are summarized per request
+        fetched_articles = []
         # We process in reverse to handle the oldest articles first
         for article_info in reversed(articles_from_web):
             url = article_info['url']
             title = article_info['title']
             
-            # 2. Check if the article already exists in the DB
-            existing_article = crud_article.get_article_by_url(db, url=url)
-            
-            if existing_article:
-                logging.info(f"Article '{title}' already exists in the database. Skipping.")
+            if url in existing_urls:
                 continue
             
             logging.info(f"✨ New article found: '{title}'. Starting processing.")
@@ -78,45 +295,56 @@ def main_pipeline():
             
             if not content_details or not content_details.get("content"):
                 logging.error(f"Could not fetch content for '{title}'. Skipping.")
+                PIPELINE_ARTICLES.inc(outcome="fetch_failed")
                 continue
-            
-            # 4. Summarize with AI
-            logging.info(f"Step 3: Summarizing article with AI...")
-            ai_result = summarizer.summarize_article_with_ai(
-                title=title,
-                content=content_details["content"]
-            )
-            
-            if not ai_result:
-                logging.error(f"AI summarization failed for '{title}'. Skipping.")
+
+            fetched_articles.append((article_info, content_details))
+            if len(fetched_articles) < max(1, AI_BATCH_SIZE):
                 continue
-            
-            # 5. Save to database
-            logging.info(f"Step 4: Saving article '{title}' to the database...")
-            
-            # The 'skills' list needs to be stored as a JSON string
-            skills_json_string = json.dumps(ai_result['skills'], ensure_ascii=False)
-            
-            crud_article.create_article(
-                db=db,
-                title=title,
-                url=url,
-                published_date=content_details["published_date"],
-                summary=ai_result["summary"],
-                skills=skills_json_string
-            )
-            
-            logging.info(f"✅ Successfully processed and saved '{title}'.")
-            new_articles_processed += 1
 
-        logging.info(f"Pipeline finished. Processed {new_articles_processed} new articles.")
+            # 4. Summarize with AI
+            pending_articles.extend(_summarize_fetched(fetched_articles, detector, run_results))
+            fetched_articles = []
+
+            # 5. Queue for saving; articles are written to the database in batches
+            if len(pending_articles) >= WRITE_BATCH_SIZE:
+                new_articles_processed += save_articles(db, pending_articles)
+                pending_articles = []
+
+        pending_articles.extend(_summarize_fetched(fetched_articles, detector, run_results))
+        new_articles_processed += save_articles(db, pending_articles)
+
+        cache_stats = summarizer.get_cache_stats()
+        logging.info(f"Pipeline finished. Processed {new_articles_processed} new articles "
+                     f"(summary cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses).")
+        return new_articles_processed
 
     except Exception as e:
         logging.error(f"An unexpected error occurred during the pipeline: {e}", exc_info=True)
+        # Re-raised so the caller (and the web app's runner process) sees the run as failed
+        raise
     finally:
+        if detector:
+            detector.close()
         if db:
             db.close()
             logging.info("Database session closed.")
 
 if __name__ == "__main__":
-    main_pipeline()
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the AI Time Tree data pipeline.")
+    parser.add_argument("--concurrent", action="store_true", default=None,
+                        help="Fetch and summarize new articles concurrently.")
+    parser.add_argument("--refresh", action="store_true", default=None,
+                        help="Also re-fetch existing articles and re-summarize the ones whose content changed.")
+    args = parser.parse_args()
+
+    # Don't overlap with a run started by the web app (or another cron invocation)
+    from app.core.locks import ProcessLock
+    lock = ProcessLock("pipeline")
+    if not lock.acquire():
+        sys.exit("Another process is already running the pipeline.")
+    try:
+        main_pipeline(concurrent=args.concurrent, refresh=args.refresh)
+    finally:
+        lock.release()
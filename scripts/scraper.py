@@ -1,34 +1,37 @@
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import logging
 from datetime import datetime
 from urllib.parse import urljoin
 import re
 
+from scripts.http_client import get_client
+from app.core.metrics import PIPELINE_STAGE_SECONDS
+
 # 配置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # 目标网站 URL
 TARGET_URL = "https://www.aivi.fyi/"
 
-def fetch_article_urls(base_url: str):
+# 可选使用更快的 lxml 解析器，未安装时退回标准库的 html.parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# SoupStrainer 让解析器只为需要的节点建树，跳过导航栏、侧边栏、脚本等无关内容。
+# 解析阶段 class 属性还是完整字符串，因此用正则匹配其中的单个类名。
+LIST_STRAINER = SoupStrainer('div', class_=re.compile(r'(^|\s)list__item(\s|$)'))
+ARTICLE_STRAINER = SoupStrainer(['section', 'time', 'meta'])
+
+def parse_article_list(html: bytes, base_url: str, encoding: str = None):
     """
-    从 aivi.fyi 首页抓取最新的文章列表。
-    返回一个包含标题、链接和摘要的字典列表。
+    从首页 HTML 中解析文章列表，返回包含标题、链接和摘要的字典列表。
     """
-    logging.info(f"开始抓取文章列表: {base_url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    try:
-        response = requests.get(base_url, headers=headers, timeout=15)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        logging.error(f"抓取文章列表失败: {e}")
-        return []
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=LIST_STRAINER, from_encoding=encoding)
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
     article_items = soup.find_all('div', class_='list__item')
     
     articles = []
@@ -39,7 +42,8 @@ def fetch_article_urls(base_url: str):
     logging.info(f"找到了 {len(article_items)} 篇文章。")
 
     for item in article_items:
-        title_tag = item.find('h2', class_='archive__item-title').find('a')
+        heading = item.find('h2', class_='archive__item-title')
+        title_tag = heading.find('a') if heading else None
         excerpt_tag = item.find('p', class_='archive__item-excerpt')
         
         if title_tag and excerpt_tag:
@@ -56,22 +60,12 @@ def fetch_article_urls(base_url: str):
             
     return articles
 
-def fetch_article_content(article_url: str):
+def parse_article_content(html: bytes, article_url: str = "", encoding: str = None):
     """
-    抓取单篇文章的详细内容和发布日期。
+    从文章页 HTML 中解析正文和发布日期。
+    只构建正文 section、time 和 meta 节点，未找到正文区域时返回 None。
     """
-    logging.info(f"开始抓取文章内容: {article_url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-    try:
-        response = requests.get(article_url, headers=headers, timeout=15)
-        response.raise_for_status()
-    except requests.RequestException as e:
-        logging.error(f"抓取文章内容失败: {e}")
-        return None
-
-    soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=ARTICLE_STRAINER, from_encoding=encoding)
     
     # 正确的内容选择器
     content_section = soup.find('section', class_='page__content')
@@ -113,6 +107,39 @@ def fetch_article_content(article_url: str):
         "published_date": published_date
     }
 
+def fetch_article_urls(base_url: str):
+    """
+    从 aivi.fyi 首页抓取最新的文章列表。
+    返回一个包含标题、链接和摘要的字典列表。
+    列表页抓取失败时抛出 requests.RequestException，数据管道据此把本次运行记为失败，
+    而不是当作"没有新文章"。
+    """
+    logging.info(f"开始抓取文章列表: {base_url}")
+    try:
+        with PIPELINE_STAGE_SECONDS.time(stage="listing_fetch"):
+            response = get_client().fetch(base_url, timeout=15)
+    except requests.RequestException as e:
+        logging.error(f"抓取文章列表失败: {e}")
+        raise
+
+    with PIPELINE_STAGE_SECONDS.time(stage="parse"):
+        return parse_article_list(response.content, base_url, encoding=response.encoding)
+
+def fetch_article_content(article_url: str):
+    """
+    抓取单篇文章的详细内容和发布日期。
+    """
+    logging.info(f"开始抓取文章内容: {article_url}")
+    try:
+        with PIPELINE_STAGE_SECONDS.time(stage="content_fetch"):
+            response = get_client().fetch(article_url, timeout=15)
+    except requests.RequestException as e:
+        logging.error(f"抓取文章内容失败: {e}")
+        return None
+
+    with PIPELINE_STAGE_SECONDS.time(stage="parse"):
+        return parse_article_content(response.content, article_url, encoding=response.encoding)
+
 if __name__ == '__main__':
     logging.info("--- 开始测试最终版爬虫脚本 (aivi.fyi) ---")
     
@@ -1,42 +1,33 @@
+import asyncio
 import logging
 import sys
 import os
 import json
+import hashlib
+import threading
 
 # 将项目根目录添加到 Python 路径中
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-# 显式加载 .env 文件，确保配置在导入其他模块前生效
-from dotenv import load_dotenv
-dotenv_path = os.path.join(project_root, '.env')
-if os.path.exists(dotenv_path):
-    load_dotenv(dotenv_path)
-    logging.info(f"Loaded .env file from: {dotenv_path}")
-else:
-    logging.warning(".env file not found, using environment variables.")
+# .env 由 app.core.config 在导入时加载；AI 客户端在第一次调用时才创建
+from app.core.ai_provider import get_default_client
+from app.core.config import (
+    LLM_CACHE_ENABLED, LLM_MAX_INPUT_TOKENS, LLM_MAX_CHUNKS,
+    AI_BATCH_SIZE, LLM_BATCH_MAX_ARTICLE_TOKENS
+)
+from app.core.database import SessionLocal
+from app.crud import summary_cache as crud_summary_cache
+from scripts.content_compactor import compact_content, estimate_tokens, split_into_chunks
 
-# 从我们新的抽象层导入全局 AI 客户端实例
-from app.core.ai_provider import ai_client
-from app.core.config import is_config_valid
+# Bump this whenever SYSTEM_PROMPT or the expected output format changes.
+# Cached results produced with another version are ignored and can be purged
+# with `python scripts/llm_cache.py invalidate`.
+PROMPT_VERSION = "v1"
 
-def summarize_article_with_ai(title: str, content: str):
-    """
-    使用配置好的通用 AI 客户端总结文章内容并提取技巧。
-    """
-    if not ai_client:
-        logging.error("AI client is not initialized. Check configuration and errors on startup.")
-        return None
-
-    # 为避免超出 token 限制，对过长的文章内容进行截断
-    max_length = 15000
-    if len(content) > max_length:
-        logging.warning(f"Content length ({len(content)}) is too long, truncating to {max_length} characters.")
-        content = content[:max_length]
-
-    # System prompt with instructions for the AI
-    system_prompt = """
+# System prompt with instructions for the AI
+SYSTEM_PROMPT = """
     作为一名顶尖的中文AI技术分析师，你的任务是深入分析技术文章并产出一个结构化的 JSON 对象。
     这个 JSON 对象必须包含 "summary" 和 "skills" 两个键。
 
@@ -51,9 +42,305 @@ def summarize_article_with_ai(title: str, content: str):
     请严格按照 JSON 格式返回结果，确保所有文本都是简体中文。
     """
 
+# Batch mode: several short articles share one request and one copy of the instructions
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+    本次请求包含多篇文章，每篇文章以 [编号] 开头。请为每一篇文章分别生成上述 JSON 对象，
+    并加上 "id" 键（值为该文章的编号字符串），最终返回 {"results": [...]}，
+    其中每篇文章对应一个元素。不要遗漏文章，也不要混合不同文章的内容。
+    """
+
+_cache_stats = {"hits": 0, "misses": 0}
+_cache_stats_lock = threading.Lock()
+
+def normalize_content(content: str) -> str:
+    """Collapses whitespace so formatting-only changes don't produce a new cache key."""
+    return " ".join(content.split())
+
+def make_cache_key(title: str, content: str, provider: str, model_id: str) -> str:
+    """Content-addressed key: hash of (normalized content, title, prompt version, provider, model)."""
+    payload = json.dumps(
+        [normalize_content(content), title.strip(), PROMPT_VERSION, provider, model_id],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def content_hash(content: str) -> str:
+    """Hash of the normalized article body; the refresh mode only re-summarizes when it changes."""
+    return hashlib.sha256(normalize_content(content).encode("utf-8")).hexdigest()
+
+def get_cache_stats() -> dict:
+    """Returns the summary cache hits and misses recorded in this process."""
+    with _cache_stats_lock:
+        return dict(_cache_stats)
+
+def _record_cache_lookup(hit: bool):
+    with _cache_stats_lock:
+        _cache_stats["hits" if hit else "misses"] += 1
+
+def _load_cached_result(cache_key: str):
+    db = SessionLocal()
+    try:
+        return crud_summary_cache.get_cached_summary(db, cache_key)
+    except Exception as e:
+        logging.warning(f"Summary cache lookup failed, calling the AI provider instead: {e}")
+        return None
+    finally:
+        db.close()
+
+def _store_cached_result(cache_key: str, result: dict):
+    client = get_default_client()
+    db = SessionLocal()
+    try:
+        crud_summary_cache.save_cached_summary(
+            db, cache_key, PROMPT_VERSION, client.provider_name, client.model_id, result
+        )
+    except Exception as e:
+        logging.warning(f"Failed to store result in the summary cache: {e}")
+    finally:
+        db.close()
+
+def _lookup_cache(title: str, content: str):
+    """Returns (cache_key, cached_result); both are None when caching is disabled."""
+    if not LLM_CACHE_ENABLED:
+        return None, None
+    client = get_default_client()
+    cache_key = make_cache_key(title, content, client.provider_name, client.model_id)
+    cached = _load_cached_result(cache_key)
+    _record_cache_lookup(cached is not None)
+    if cached is not None:
+        logging.info(f"Summary cache hit for '{title}', skipping the AI call.")
+    return cache_key, cached
+
+def summarize_article_with_ai(title: str, content: str):
+    """
+    使用配置好的通用 AI 客户端总结文章内容并提取技巧。
+    内容会先经过压缩（去重、去除低信息量段落），超出 token 预算的长文会分块总结后再合并。
+    """
+    if not get_default_client():
+        logging.error("AI client is not initialized. Check configuration and errors on startup.")
+        return None
+
+    cache_key, cached = _lookup_cache(title, content)
+    if cached is not None:
+        return cached
+
+    result = _summarize_content(title, content)
+    if result and cache_key:
+        _store_cached_result(cache_key, result)
+    return result
+
+async def asummarize_article_with_ai(title: str, content: str):
+    """
+    summarize_article_with_ai 的异步版本，使用 AI 客户端的原生异步接口，
+    可以在同一个事件循环上同时进行多篇文章的总结。
+    """
+    if not get_default_client():
+        logging.error("AI client is not initialized. Check configuration and errors on startup.")
+        return None
+
+    cache_key, cached = await asyncio.to_thread(_lookup_cache, title, content)
+    if cached is not None:
+        return cached
+
+    result = await _asummarize_content(title, content)
+    if result and cache_key:
+        await asyncio.to_thread(_store_cached_result, cache_key, result)
+    return result
+
+def _summarize_content(title: str, content: str):
+    # 去掉重复和低信息量的段落，减少输入 token
+    content = compact_content(content)
+    if not content:
+        _log_empty_content(title)
+        return None
+    provider = get_default_client().provider_name
+    if estimate_tokens(content, provider) <= LLM_MAX_INPUT_TOKENS:
+        return _summarize_once(title, content)
+    return _summarize_map_reduce(title, content, provider)
+
+async def _asummarize_content(title: str, content: str):
+    content = compact_content(content)
+    if not content:
+        _log_empty_content(title)
+        return None
+    provider = get_default_client().provider_name
+    if estimate_tokens(content, provider) <= LLM_MAX_INPUT_TOKENS:
+        return await _asummarize_once(title, content)
+    return await _asummarize_map_reduce(title, content, provider)
+
+def _log_empty_content(title: str):
+    logging.warning(f"Nothing left of '{title}' after compaction (boilerplate only), skipping the AI call.")
+
+def summarize_articles_batch(articles: list) -> list:
+    """
+    批量总结多篇文章，`articles` 为 {"title", "content"} 字典列表，按相同顺序返回结果（失败为 None）。
+    较短的文章每 AI_BATCH_SIZE 篇打包进同一个请求，共用一份系统提示词；
+    长文和批量结果中缺失或格式错误的文章会退回到单篇总结。
+    """
+    if not get_default_client():
+        logging.error("AI client is not initialized. Check configuration and errors on startup.")
+        return [None] * len(articles)
+
+    results, cache_keys, singles, groups = _plan_batches(articles)
+    for index in singles:
+        results[index] = _summarize_content(articles[index]["title"], articles[index]["content"])
+    for group in groups:
+        batch_results = _summarize_group(group)
+        for index, title, content in group:
+            results[index] = batch_results.get(index) or _summarize_fallback(title, content)
+
+    for index in [*singles, *(entry[0] for group in groups for entry in group)]:
+        if results[index] and cache_keys[index]:
+            _store_cached_result(cache_keys[index], results[index])
+    return results
+
+async def asummarize_articles_batch(articles: list) -> list:
+    """summarize_articles_batch 的异步版本，各个请求并发发送。"""
+    if not get_default_client():
+        logging.error("AI client is not initialized. Check configuration and errors on startup.")
+        return [None] * len(articles)
+
+    results, cache_keys, singles, groups = await asyncio.to_thread(_plan_batches, articles)
+
+    async def run_single(index):
+        results[index] = await _asummarize_content(articles[index]["title"], articles[index]["content"])
+
+    async def run_group(group):
+        batch_results = await _asummarize_group(group)
+        await asyncio.gather(*(run_fallback(index, title, content, batch_results)
+                               for index, title, content in group))
+
+    async def run_fallback(index, title, content, batch_results):
+        results[index] = batch_results.get(index) or await _asummarize_fallback(title, content)
+
+    await asyncio.gather(*(run_single(i) for i in singles), *(run_group(g) for g in groups))
+
+    for index in [*singles, *(entry[0] for group in groups for entry in group)]:
+        if results[index] and cache_keys[index]:
+            await asyncio.to_thread(_store_cached_result, cache_keys[index], results[index])
+    return results
+
+def prepare_offline_request(title: str, content: str):
+    """
+    为离线 Batch API 准备单篇文章的请求，返回 (cache_key, cached_result, prompt)。
+    已有缓存结果、压缩后没有剩余内容，或文章超出 token 预算（需要在线分块总结）时 prompt 为 None。
+    """
+    cache_key, cached = _lookup_cache(title, content)
+    if cached is not None:
+        return cache_key, cached, None
+    content = compact_content(content)
+    if not content:
+        _log_empty_content(title)
+        return cache_key, None, None
+    if estimate_tokens(content, get_default_client().provider_name) > LLM_MAX_INPUT_TOKENS:
+        return cache_key, None, None
+    return cache_key, None, _build_prompt_payload(title, content)
+
+def finish_offline_result(cache_key: str, raw_result):
+    """校验离线 Batch API 返回的结果，有效时写入缓存并返回，否则返回 None。"""
+    result = _validate_result(raw_result)
+    if result and cache_key:
+        _store_cached_result(cache_key, result)
+    return result
+
+def _plan_batches(articles: list):
+    """
+    Looks up every article in the cache, then splits the remaining ones into
+    long articles that are summarized alone (`singles`, a list of indexes) and
+    groups of up to AI_BATCH_SIZE short ones that share a request. Group entries
+    are (index, title, compacted content). Returns (results, cache_keys, singles, groups).
+    """
+    results = [None] * len(articles)
+    cache_keys = [None] * len(articles)
+    singles, groups = [], []
+    current, current_tokens = [], 0
+    provider = get_default_client().provider_name
+
+    for index, article in enumerate(articles):
+        cache_keys[index], results[index] = _lookup_cache(article["title"], article["content"])
+        if results[index] is not None:
+            continue
+        content = compact_content(article["content"])
+        if not content:
+            # Left as None: there is nothing to summarize
+            _log_empty_content(article["title"])
+            continue
+        tokens = estimate_tokens(content, provider)
+        if AI_BATCH_SIZE <= 1 or tokens > LLM_BATCH_MAX_ARTICLE_TOKENS:
+            singles.append(index)
+            continue
+        if current and (len(current) >= AI_BATCH_SIZE or current_tokens + tokens > LLM_MAX_INPUT_TOKENS):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append((index, article["title"], content))
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+
+    # A group of one gains nothing from the batch prompt
+    for group in [g for g in groups if len(g) == 1]:
+        groups.remove(group)
+        singles.append(group[0][0])
+    if groups:
+        logging.info(f"Summarizing {sum(len(g) for g in groups)} articles in {len(groups)} batch requests, "
+                     f"{len(singles)} on their own.")
+    return results, cache_keys, singles, groups
+
+def _build_batch_payload(group: list) -> str:
+    sections = "\n\n".join(
+        f"[{position}] 标题:《{title}》\n内容:\n---\n{content}\n---"
+        for position, (_, title, content) in enumerate(group, 1)
+    )
+    user_prompt = f"请根据以下 {len(group)} 篇文章生成所需的 JSON 对象。\n\n{sections}"
+    return json.dumps([
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ])
+
+def _parse_batch_results(raw, group: list) -> dict:
+    """Maps each valid entry of a batch response back to its article index; invalid entries are left out."""
+    entries = raw.get("results") if isinstance(raw, dict) else raw
+    if not isinstance(entries, list):
+        logging.error(f"Batch AI response has incorrect JSON structure: {raw}")
+        return {}
+    index_by_id = {str(position): index for position, (index, _, _) in enumerate(group, 1)}
+    parsed = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        index = index_by_id.get(str(entry.get("id")).strip("[] "))
+        if index is not None and _is_valid_result(entry):
+            parsed[index] = {"summary": entry["summary"], "skills": entry["skills"]}
+    if len(parsed) < len(group):
+        logging.warning(f"Batch response contained {len(parsed)} of {len(group)} valid results.")
+    return parsed
+
+def _summarize_group(group: list) -> dict:
+    try:
+        return _parse_batch_results(get_default_client().generate_structured_output(_build_batch_payload(group)), group)
+    except Exception as e:
+        logging.error(f"An error occurred during batch AI summarization: {e}")
+        return {}
+
+async def _asummarize_group(group: list) -> dict:
+    try:
+        return _parse_batch_results(await get_default_client().agenerate_structured_output(_build_batch_payload(group)), group)
+    except Exception as e:
+        logging.error(f"An error occurred during batch AI summarization: {e}")
+        return {}
+
+def _summarize_fallback(title: str, content: str):
+    logging.info(f"No valid batch result for '{title}', summarizing it on its own.")
+    return _summarize_once(title, content)
+
+async def _asummarize_fallback(title: str, content: str):
+    logging.info(f"No valid batch result for '{title}', summarizing it on its own.")
+    return await _asummarize_once(title, content)
+
+def _build_prompt_payload(title: str, content: str, note: str = "") -> str:
     # User prompt with the actual article content
     user_prompt = f"""
-    请根据以下文章生成所需的 JSON 对象。
+    请根据以下文章生成所需的 JSON 对象。{note}
     标题:《{title}》
     内容:
     ---
@@ -64,30 +351,101 @@ def summarize_article_with_ai(title: str, content: str):
     # For OpenAI-compatible clients, we'll pass a JSON string representing the message list.
     # For Gemini, it will be treated as a single string.
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_prompt}
     ]
     
     # We serialize the list to a JSON string to pass it through the generic interface.
-    prompt_payload = json.dumps(messages)
+    return json.dumps(messages)
+
+def _is_valid_result(result) -> bool:
+    # Skills are stored one row per text, so anything but a list of strings is rejected
+    return (bool(result) and "summary" in result and "skills" in result
+            and isinstance(result["skills"], list)
+            and all(isinstance(skill, str) for skill in result["skills"]))
 
+def _validate_result(result):
+    if _is_valid_result(result):
+        return result
+    logging.error(f"AI response has incorrect JSON structure: {result}")
+    return None
+
+def _summarize_once(title: str, content: str, note: str = ""):
+    """Sends one summarization request and validates the returned structure."""
     try:
-        result = ai_client.generate_structured_output(prompt_payload)
+        return _validate_result(get_default_client().generate_structured_output(_build_prompt_payload(title, content, note)))
+    except Exception as e:
+        logging.error(f"An error occurred during AI summarization: {e}")
+        return None
 
-        # Simple result validation
-        if result and "summary" in result and "skills" in result and isinstance(result["skills"], list):
-            return result
-        else:
-            logging.error(f"AI response has incorrect JSON structure: {result}")
-            return None
+async def _asummarize_once(title: str, content: str, note: str = ""):
+    try:
+        return _validate_result(await get_default_client().agenerate_structured_output(_build_prompt_payload(title, content, note)))
     except Exception as e:
         logging.error(f"An error occurred during AI summarization: {e}")
         return None
 
+def _split_for_map_reduce(title: str, content: str, provider: str) -> list:
+    chunks = split_into_chunks(content, LLM_MAX_INPUT_TOKENS, provider)
+    if len(chunks) > LLM_MAX_CHUNKS:
+        logging.warning(f"Article '{title}' has {len(chunks)} chunks, only the first {LLM_MAX_CHUNKS} are summarized.")
+        chunks = chunks[:LLM_MAX_CHUNKS]
+    logging.info(f"Content of '{title}' exceeds {LLM_MAX_INPUT_TOKENS} tokens, summarizing {len(chunks)} chunks.")
+    return chunks
+
+def _chunk_note(index: int, total: int) -> str:
+    return f"（这是一篇长文的第 {index}/{total} 部分，只需总结这一部分。）"
+
+_REDUCE_NOTE = "（以下内容是这篇长文各部分的摘要和要点，请合并为全文的结果。）"
+
+def _merge_partials(partials: list) -> str:
+    return "\n\n".join(
+        f"第 {i} 部分摘要：{p['summary']}\n第 {i} 部分要点：" + "；".join(str(s) for s in p["skills"])
+        for i, p in enumerate(partials, 1)
+    )
+
+def _log_failed_chunk(title: str, index: int, total: int):
+    logging.error(f"Chunk {index}/{total} of '{title}' could not be summarized, giving up on the article.")
+
+def _summarize_map_reduce(title: str, content: str, provider: str):
+    """
+    Summarizes an article that does not fit the token budget: each chunk is
+    summarized on its own (map), then the partial results are merged into the
+    final summary with the regular prompt (reduce).
+    If any chunk fails the whole article fails (and isn't cached): a summary of
+    only some chunks would silently lose coverage.
+    """
+    chunks = _split_for_map_reduce(title, content, provider)
+    partials = []
+    for i, chunk in enumerate(chunks, 1):
+        partial = _summarize_once(title, chunk, note=_chunk_note(i, len(chunks)))
+        if not partial:
+            _log_failed_chunk(title, i, len(chunks))
+            return None
+        partials.append(partial)
+    if len(partials) == 1:
+        return partials[0]
+    return _summarize_once(title, _merge_partials(partials), note=_REDUCE_NOTE)
+
+async def _asummarize_map_reduce(title: str, content: str, provider: str):
+    """Async map-reduce; the chunk summaries are requested concurrently."""
+    chunks = _split_for_map_reduce(title, content, provider)
+    results = await asyncio.gather(*(
+        _asummarize_once(title, chunk, note=_chunk_note(i, len(chunks)))
+        for i, chunk in enumerate(chunks, 1)
+    ))
+    for i, partial in enumerate(results, 1):
+        if not partial:
+            _log_failed_chunk(title, i, len(chunks))
+            return None
+    if len(results) == 1:
+        return results[0]
+    return await _asummarize_once(title, _merge_partials(results), note=_REDUCE_NOTE)
+
 if __name__ == '__main__':
     logging.info("--- Testing the AI Summarizer Script with Generic Provider ---")
     
-    if not is_config_valid or not ai_client:
+    if not get_default_client():
         logging.error("AI configuration is invalid or client failed to initialize. Test aborted.")
         logging.error("Please ensure your .env file is correctly set up.")
     else:
@@ -3,10 +3,13 @@ document.addEventListener('DOMContentLoaded', function() {
     const loadTrigger = document.getElementById('load-trigger');
     const loadingIndicator = document.getElementById('loading-indicator');
 
-    let currentPage = 0;
+    // 服务端返回的游标，指向下一页的起点；首页为 null
+    let nextCursor = null;
     const articlesPerPage = 10;
     let isLoading = false;
     let allArticlesLoaded = false;
+    // 已显示的文章 id，实时推送和分页加载到同一篇文章时只显示一次
+    const shownArticleIds = new Set();
 
     // 格式化日期函数 (最终健壮版)
     function formatDate(dateString) {
@@ -54,6 +57,23 @@ document.addEventListener('DOMContentLoaded', function() {
         return card;
     }
 
+    // 将一页文章追加到时间轴，并记录下一页的游标
+    function renderPage(page) {
+        page.items.forEach(article => {
+            if (shownArticleIds.has(article.id)) return;
+            shownArticleIds.add(article.id);
+            const card = createArticleCard(article);
+            timeline.appendChild(card);
+        });
+        nextCursor = page.next_cursor;
+
+        if (!nextCursor) {
+            // 没有下一页游标，说明所有文章都已加载
+            allArticlesLoaded = true;
+            loadingIndicator.innerHTML = '<p>已加载全部内容</p>';
+        }
+    }
+
     // 加载文章数据的函数
     async function loadArticles() {
         if (isLoading || allArticlesLoaded) return;
@@ -62,28 +82,16 @@ document.addEventListener('DOMContentLoaded', function() {
         loadingIndicator.style.display = 'block';
 
         try {
-            const skip = currentPage * articlesPerPage;
-            const response = await fetch(`/api/articles?skip=${skip}&limit=${articlesPerPage}`);
+            let url = `/api/articles?limit=${articlesPerPage}`;
+            if (nextCursor) {
+                url += `&cursor=${encodeURIComponent(nextCursor)}`;
+            }
+            const response = await fetch(url);
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            const newArticles = await response.json();
-
-            // --- 调试代码：将获取到的原始数据打印到控制台 ---
-            console.log("从后端接收到的原始文章数据:", newArticles);
-            // ------------------------------------------------
-
-            if (newArticles.length > 0) {
-                newArticles.forEach(article => {
-                    const card = createArticleCard(article);
-                    timeline.appendChild(card);
-                });
-                currentPage++;
-            } else {
-                // 如果返回的文章数量为0，说明所有文章都已加载
-                allArticlesLoaded = true;
-                loadingIndicator.innerHTML = '<p>已加载全部内容</p>';
-            }
+            const page = await response.json();
+            renderPage(page);
         } catch (error) {
             console.error('加载文章失败:', error);
             loadingIndicator.innerHTML = '<p>加载内容失败，请稍后重试。</p>';
@@ -109,6 +117,26 @@ document.addEventListener('DOMContentLoaded', function() {
     // 开始观察 'load-trigger' 元素
     observer.observe(loadTrigger);
 
-    // 初始加载第一页数据
-    loadArticles();
+    // 初始加载第一页数据：预渲染的页面已内嵌第一页时直接使用，否则请求接口
+    const initialPage = document.getElementById('initial-page');
+    if (initialPage) {
+        renderPage(JSON.parse(initialPage.textContent));
+        loadingIndicator.style.display = allArticlesLoaded ? 'block' : 'none';
+    } else {
+        loadArticles();
+    }
+
+    // 通过 Server-Sent Events 接收新写入的文章，插入到时间轴顶部，无需刷新页面。
+    // 断线后浏览器会自动重连，并通过 Last-Event-ID 补发错过的文章。
+    if (window.EventSource) {
+        const stream = new EventSource('/api/stream');
+        stream.addEventListener('article', (event) => {
+            const article = JSON.parse(event.data);
+            if (shownArticleIds.has(article.id)) return;
+            shownArticleIds.add(article.id);
+            const card = createArticleCard(article);
+            card.classList.add('timeline-card--new');
+            timeline.prepend(card);
+        });
+    }
 });